@@ -0,0 +1,73 @@
+import sys
+import time
+import numpy as np
+from skimage import data
+from ImageOperations import ImageOperations
+from Descriptors import Descriptors
+
+
+#operações comparadas: cada uma recebe (pilha, batch) e é chamada com batch=True na pilha inteira ou imagem a imagem
+OPERATIONS = {
+    'mean': lambda img, batch: ImageOperations.apply_filter_array(img, 'mean', batch=batch),
+    'median': lambda img, batch: ImageOperations.apply_filter_array(img, 'median', batch=batch),
+    'gaussian': lambda img, batch: ImageOperations.apply_filter_array(img, 'gaussian', batch=batch),
+    'sobel': lambda img, batch: ImageOperations.apply_filter_array(img, 'sobel', batch=batch),
+    'frequency_lowpass': lambda img, batch: ImageOperations.frequency_filter_array(img, 'lowpass', batch=batch),
+    'spectrum': lambda img, batch: ImageOperations.calculate_fourier_spectrum(img, batch=batch),
+    'otsu': lambda img, batch: ImageOperations.apply_otsu(img, batch=batch),
+    'contrast': lambda img, batch: ImageOperations.contrast_stretching(img, batch=batch),
+    'equalization': lambda img, batch: ImageOperations.histogram_equalization(img, batch=batch),
+    'dilation': lambda img, batch: ImageOperations.apply_morphology(img, 'dilation', batch=batch),
+    'histogram': lambda img, batch: ImageOperations.calculate_histogram(img, batch=batch),
+    'intensity_stats': lambda img, batch: Descriptors.calculate_intensity_stats(img, batch=batch),
+    'haralick': lambda img, batch: Descriptors.calculate_haralick_features(img, batch=batch),
+    'shape_moments': lambda img, batch: Descriptors.calculate_shape_moments(img, batch=batch)
+}
+
+
+class Benchmark:
+    @staticmethod
+    def make_stack(count=512, size=64): #pilha (N, size, size) uint8 com recortes de uma imagem de exemplo
+        source = np.tile(data.camera(), (2, 2))
+        rng = np.random.default_rng(0)
+        corners = rng.integers(0, source.shape[0] - size, (count, 2))
+        return np.stack([source[r:r + size, c:c + size] for r, c in corners])
+
+    @staticmethod
+    def best_time(function, repeat=3): #menor tempo entre as repetições (menos sujeito a ruído do sistema)
+        best = np.inf
+        for _ in range(repeat):
+            start = time.perf_counter()
+            function()
+            best = min(best, time.perf_counter() - start)
+        return best
+
+    @staticmethod
+    def compare(stack, operations=None, repeat=3): #imagens/s no laço por imagem e na pilha vetorizada
+        results = {}
+        for name in operations or OPERATIONS:
+            operation = OPERATIONS[name]
+            loop = Benchmark.best_time(lambda: [operation(img, False) for img in stack], repeat)
+            batch = Benchmark.best_time(lambda: operation(stack, True), repeat)
+            results[name] = {
+                'loop_images_per_sec': len(stack) / loop,
+                'batch_images_per_sec': len(stack) / batch,
+                'speedup': loop / batch
+            }
+        return results
+
+    @staticmethod
+    def print_report(results):
+        print(f"{'operação':<18}{'laço (img/s)':>14}{'lote (img/s)':>14}{'ganho':>8}")
+        for name, row in results.items():
+            print(f"{name:<18}{row['loop_images_per_sec']:>14.1f}{row['batch_images_per_sec']:>14.1f}{row['speedup']:>7.2f}x")
+
+
+if __name__ == '__main__':
+    #uso: python Benchmark.py [quantidade] [lado]; o lote compensa em muitas imagens pequenas (menos chamadas em Python).
+    #em imagens grandes o batch=True volta ao laço (limites em ImageOperations.BATCH_MAX_PIXELS, medidos com este script)
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 512
+    size = int(sys.argv[2]) if len(sys.argv) > 2 else 64
+    stack = Benchmark.make_stack(count, size)
+    print(f"pilha {stack.shape} {stack.dtype}")
+    Benchmark.print_report(Benchmark.compare(stack))
@@ -0,0 +1,52 @@
+import collections
+import numpy as np
+
+
+#256 MiB por pool: cobre filtro + FFT de um quadro de ~4000x4000 (ou pilhas do mesmo volume). acima disso os buffers
+#de uma mesma chamada se expulsam e cada chamada volta a alocar; para quadros maiores, aumentar o limite
+#(ImageOperations.set_pool_limit)
+DEFAULT_MAX_BYTES = 256 << 20
+
+
+class BufferPool:
+    #reserva de buffers reaproveitáveis, indexados por (nome, shape, dtype). passando de max_bytes, os usados há mais
+    #tempo saem do pool (quem ainda tem a referência continua com o array; só a próxima chamada volta a alocar)
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self._buffers = collections.OrderedDict()
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.allocations = 0 #quantos buffers novos foram alocados desde o último reset_counter
+
+    def get(self, shape, dtype, name='scratch'): #devolve um buffer (conteúdo indefinido), alocando só na primeira vez
+        key = (name, tuple(shape), np.dtype(dtype))
+        return self._lookup(key, lambda: np.empty(shape, dtype))
+
+    def get_cached(self, key, factory): #guarda arrays constantes (ex.: máscaras de frequência) criados por factory()
+        return self._lookup(('cached',) + tuple(key), factory)
+
+    def _lookup(self, key, factory):
+        value = self._buffers.get(key)
+        if value is not None:
+            self._buffers.move_to_end(key)
+            return value
+        value = factory()
+        self._buffers[key] = value
+        self.nbytes += value.nbytes
+        self.allocations += 1
+        self._evict()
+        return value
+
+    def _evict(self): #remove os mais antigos até caber em max_bytes (o último pedido fica, mesmo se for maior que o limite)
+        while self.nbytes > self.max_bytes and len(self._buffers) > 1:
+            _, buffer = self._buffers.popitem(last=False)
+            self.nbytes -= buffer.nbytes
+
+    def reset_counter(self):
+        self.allocations = 0
+
+    def clear(self): #libera todos os buffers (ex.: ao trocar o tamanho das imagens processadas)
+        self._buffers.clear()
+        self.nbytes = 0
+
+    def __len__(self):
+        return len(self._buffers)
@@ -0,0 +1,242 @@
+import os
+import atexit
+import json
+import time
+import hashlib
+import threading
+import numpy as np
+import scipy.fft
+import cv2
+from ImageOperations import ImageOperations
+
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'pdi_sin392')
+DEFAULT_MAX_BYTES = 1 << 30 #1 GiB
+RACY_SECONDS = 2 #resolução de mtime mais grossa comum (FAT); ver entry_key
+INDEX_FLUSH_SECONDS = 30 #leituras só atualizam o índice em memória; ele vai para o disco a cada put ou a cada 30 s
+
+#versão do algoritmo de cada artefato, parte do nome no cache: ao mudar o cálculo, incrementar a versão
+#faz as entradas antigas deixarem de ser encontradas (e saírem pelo LRU)
+ARTIFACT_VERSIONS = {
+    'histogram': 1,
+    'rfft2': 1,
+    'pyramid': 1,
+    'descriptors_intensity_stats': 1,
+    'descriptors_haralick': 2, #GLCM por bincount + propriedades em produtos matriciais
+    'descriptors_shape_moments': 1
+}
+
+
+class DerivedCache:
+    #cache em disco de dados derivados de cada arquivo (histograma, rfft2, pirâmide, descritores), em .npy mapeados em memória.
+    #a entrada de um arquivo é identificada por caminho + mtime + hash do conteúdo: editar o arquivo gera outra entrada,
+    #e as antigas saem pelo LRU quando o diretório passa de max_bytes
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._index_path = os.path.join(directory, 'index.json')
+        self._index = self._read_index()
+        self._dirty = False
+        self._last_flush = time.monotonic()
+        atexit.register(self.flush)
+
+    def entry_key(self, path): #chave da entrada: hash de (caminho absoluto, mtime, hash do conteúdo)
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        with self._lock:
+            known = self._index['files'].get(path)
+        #o hash do conteúdo só é refeito quando o stat muda (mtime, ctime, tamanho ou inode, que muda quando o arquivo é
+        #substituído). o stat só vale se o hash foi feito mais de RACY_SECONDS depois do mtime: uma regravação do mesmo
+        #tamanho dentro da resolução do mtime deixaria o stat igual, então arquivos recém-modificados são sempre rehashados
+        signature = {'mtime_ns': stat.st_mtime_ns, 'ctime_ns': stat.st_ctime_ns, 'size': stat.st_size, 'ino': stat.st_ino}
+        if known and all(known.get(field) == value for field, value in signature.items()) and \
+                known['hashed_ns'] - stat.st_mtime_ns > RACY_SECONDS * 10**9:
+            content_hash = known['content_hash']
+        else:
+            hashed_ns = time.time_ns()
+            content_hash = DerivedCache.file_hash(path)
+            with self._lock:
+                self._index['files'][path] = dict(signature, content_hash=content_hash, hashed_ns=hashed_ns)
+                self._dirty = True
+        return DerivedCache._key(path, stat.st_mtime_ns, content_hash)
+
+    def get(self, path, name): #array mapeado em memória (somente leitura) ou None
+        artifact = f"{self.entry_key(path)}/{DerivedCache.versioned(name)}"
+        artifact_path = self._artifact_path(artifact)
+        if not os.path.exists(artifact_path):
+            return None
+        with self._lock:
+            record = self._index['artifacts'].get(artifact)
+            if record is None:
+                record = {'nbytes': os.path.getsize(artifact_path)}
+                self._index['artifacts'][artifact] = record
+            record['last_access'] = time.time()
+            self._dirty = True
+            if time.monotonic() - self._last_flush > INDEX_FLUSH_SECONDS:
+                self._write_index()
+        return np.load(artifact_path, mmap_mode='r')
+
+    def put(self, path, name, array): #grava o artefato (escrita atômica) e devolve a versão mapeada em memória
+        artifact = f"{self.entry_key(path)}/{DerivedCache.versioned(name)}"
+        artifact_path = self._artifact_path(artifact)
+        os.makedirs(os.path.dirname(artifact_path), exist_ok=True)
+
+        temp_path = f"{artifact_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'wb') as file:
+            np.save(file, np.ascontiguousarray(array))
+        os.replace(temp_path, artifact_path)
+
+        with self._lock:
+            self._index['artifacts'][artifact] = {'nbytes': os.path.getsize(artifact_path), 'last_access': time.time()}
+            self._evict(keep=artifact)
+            self._write_index()
+        return np.load(artifact_path, mmap_mode='r')
+
+    def get_or_compute(self, path, name, compute):
+        cached = self.get(path, name)
+        if cached is not None:
+            return cached
+        return self.put(path, name, compute())
+
+    def histogram(self, path, image): #histograma de 256 bins da imagem original do arquivo
+        return self.get_or_compute(path, 'histogram', lambda: ImageOperations.calculate_histogram(image))
+
+    def rfft(self, path, image): #rfft2 em float32 (complex64), metade do espectro de uma imagem real
+        return self.get_or_compute(path, 'rfft2', lambda: scipy.fft.rfft2(np.asarray(image, np.float32)))
+
+    def fourier_spectrum(self, path, image): #espectro de magnitude (como calculate_fourier_spectrum) a partir da rfft2 guardada
+        img_array = np.asarray(image)
+        if img_array.ndim != 2:
+            return np.asarray(ImageOperations.calculate_fourier_spectrum(img_array))
+        return ImageOperations.fourier_spectrum_from_rfft(self.rfft(path, img_array), img_array.shape[1],
+                                                          ImageOperations._output_dtype(img_array, None))
+
+    def pyramid(self, path, image, min_size=64): #níveis 1, 2, ... (cada um com metade do lado do anterior)
+        levels = []
+        level = np.asarray(image)
+        while min(level.shape[:2]) >= 2 * min_size:
+            previous = level
+            level = self.get_or_compute(path, f"pyramid_{len(levels) + 1}", lambda: cv2.pyrDown(np.asarray(previous)))
+            levels.append(level)
+        return levels
+
+    def descriptors(self, path, name, compute): #dicionário de descritores guardado como vetor (array estruturado)
+        record = self.get_or_compute(path, f"descriptors_{name}", lambda: DerivedCache.pack_descriptors(compute()))
+        return DerivedCache.unpack_descriptors(record)
+
+    def clear(self):
+        with self._lock:
+            for artifact in list(self._index['artifacts']):
+                self._remove(artifact)
+            self._index = {'files': {}, 'artifacts': {}}
+            self._write_index()
+
+    def flush(self): #grava o índice se houver acessos ainda só em memória (também chamado ao sair)
+        with self._lock:
+            if self._dirty:
+                self._write_index()
+
+    @property
+    def nbytes(self):
+        return sum(record['nbytes'] for record in self._index['artifacts'].values())
+
+    @staticmethod
+    def versioned(name): #'pyramid_2' -> 'pyramid_2.v1', com a versão de ARTIFACT_VERSIONS
+        kind = name.rstrip('0123456789').rstrip('_')
+        return f"{name}.v{ARTIFACT_VERSIONS.get(kind, 1)}"
+
+    @staticmethod
+    def _key(path, mtime_ns, content_hash): #chave da entrada a partir do registro do arquivo
+        return hashlib.sha256(f"{path}|{mtime_ns}|{content_hash}".encode()).hexdigest()[:32]
+
+    @staticmethod
+    def file_hash(path, chunk_size=1 << 20):
+        content = hashlib.blake2b(digest_size=20)
+        with open(path, 'rb') as file:
+            for chunk in iter(lambda: file.read(chunk_size), b''):
+                content.update(chunk)
+        return content.hexdigest()
+
+    @staticmethod
+    def pack_descriptors(features): #dict (aninhado) -> array estruturado (1,) com um campo por descritor ('grupo.nome')
+        fields = DerivedCache._flatten(features)
+        record = np.zeros(1, [(name, np.float64, np.shape(value)) for name, value in fields])
+        for name, value in fields:
+            record[name] = value
+        return record
+
+    @staticmethod
+    def unpack_descriptors(record):
+        features = {}
+        for name in record.dtype.names:
+            *groups, key = name.split('.')
+            target = features
+            for group in groups:
+                target = target.setdefault(group, {})
+            value = np.array(record[name][0])
+            target[key] = value if value.ndim else value.item()
+        return features
+
+    @staticmethod
+    def _flatten(features, prefix=''):
+        fields = []
+        for key, value in features.items():
+            if isinstance(value, dict):
+                fields.extend(DerivedCache._flatten(value, f"{prefix}{key}."))
+            else:
+                fields.append((f"{prefix}{key}", np.asarray(value, np.float64)))
+        return fields
+
+    def _artifact_path(self, artifact):
+        return os.path.join(self.directory, *artifact.split('/')) + '.npy'
+
+    def _evict(self, keep): #remove os artefatos usados há mais tempo até caber em max_bytes
+        artifacts = self._index['artifacts']
+        total = sum(record['nbytes'] for record in artifacts.values())
+        for artifact in sorted(artifacts, key=lambda name: artifacts[name].get('last_access', 0)):
+            if total <= self.max_bytes:
+                break
+            if artifact == keep:
+                continue
+            total -= artifacts[artifact]['nbytes']
+            self._remove(artifact)
+        self._prune_files()
+
+    def _prune_files(self): #esquece arquivos cujos artefatos já saíram todos (o índice não cresce com cada arquivo aberto)
+        entries = {artifact.split('/')[0] for artifact in self._index['artifacts']}
+        files = self._index['files']
+        for path in list(files):
+            record = files[path]
+            if DerivedCache._key(path, record['mtime_ns'], record['content_hash']) not in entries:
+                del files[path]
+
+    def _remove(self, artifact):
+        artifact_path = self._artifact_path(artifact)
+        try:
+            os.remove(artifact_path)
+        except FileNotFoundError:
+            pass
+        except OSError:
+            return #ainda mapeado em memória (Windows): fica para a próxima limpeza
+        self._index['artifacts'].pop(artifact, None)
+        entry_dir = os.path.dirname(artifact_path)
+        if os.path.isdir(entry_dir) and not os.listdir(entry_dir):
+            os.rmdir(entry_dir)
+
+    def _read_index(self):
+        try:
+            with open(self._index_path, encoding='utf-8') as file:
+                index = json.load(file)
+            return {'files': index.get('files', {}), 'artifacts': index.get('artifacts', {})}
+        except (FileNotFoundError, ValueError):
+            return {'files': {}, 'artifacts': {}}
+
+    def _write_index(self):
+        temp_path = f"{self._index_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            json.dump(self._index, file)
+        os.replace(temp_path, self._index_path)
+        self._dirty = False
+        self._last_flush = time.monotonic()
@@ -1,48 +1,176 @@
 import numpy as np
 import cv2
-import skimage.feature
+import scipy.stats
 from skimage import measure
+from skimage.filters import threshold_otsu
+from ImageOperations import ImageOperations
 
 class Descriptors:
+    #com batch=True o eixo 0 é uma pilha de imagens do mesmo tamanho e cada valor do dicionário vira um array (N,)
+
     @staticmethod
-    def calculate_intensity_stats(image): #calcula estatísticas de intensidade da imagem
-        img_array = np.array(image)
+    def calculate_intensity_stats(image, batch=False): #calcula estatísticas de intensidade da imagem
+        img_array = np.asarray(image)
+        if batch and not ImageOperations._vectorize_batch('intensity_stats', img_array):
+            return ImageOperations._stack_results([Descriptors.calculate_intensity_stats(img) for img in img_array])
+        if batch:
+            flat = img_array.reshape(img_array.shape[0], -1)
+            return {
+                'mean': np.mean(flat, axis=1),
+                'std': np.std(flat, axis=1),
+                'median': np.median(flat, axis=1),
+                'min': np.min(flat, axis=1),
+                'max': np.max(flat, axis=1),
+                'energy': np.sum(np.square(flat, dtype=np.float64), axis=1),
+                'entropy': scipy.stats.entropy(Descriptors._batch_value_counts(flat), base=2, axis=1)
+            }
+        
         return {
             'mean': np.mean(img_array),
             'std': np.std(img_array),
             'median': np.median(img_array),
             'min': np.min(img_array),
             'max': np.max(img_array),
-            'energy': np.sum(img_array**2),
+            'energy': np.sum(np.square(img_array, dtype=np.float64)), #em float64 para não estourar em uint8/uint16
             'entropy': measure.shannon_entropy(img_array)
         }
 
     @staticmethod
-    def calculate_haralick_features(image): #calcula características de textura de Haralick usando GLCM
-        img_array = np.array(image)
-        glcm = skimage.feature.graycomatrix(
-            img_array, 
-            distances=[1], 
-            angles=[0], 
-            levels=256,
-            symmetric=True, 
-            normed=True
-        )
+    def calculate_intensity_stats_from_histogram(hist, dtype=np.uint8): #mesmas estatísticas a partir do histograma de calculate_histogram
+        #dtype: o da imagem que gerou o histograma. em uint8 os bins são os próprios níveis e o resultado é exato; nos demais
+        #dtypes cada bin cobre uma faixa e vale o seu limite inferior (estatísticas aproximadas pela largura do bin)
+        hist = np.asarray(hist, dtype=np.float64)
+        if hist.size != 256:
+            raise ValueError("O histograma deve ter os 256 bins de calculate_histogram")
+        levels = ImageOperations.histogram_bin_values(dtype)
+        total = hist.sum()
+        cdf = np.cumsum(hist)
+        nonzero = np.flatnonzero(hist)
+        
+        mean = np.dot(hist, levels) / total
+        variance = np.dot(hist, (levels - mean)**2) / total
+        #mediana: média dos dois elementos centrais da sequência ordenada (como np.median)
+        lower = np.searchsorted(cdf, (total - 1) // 2, side='right')
+        upper = np.searchsorted(cdf, total // 2, side='right')
+        p = hist[nonzero] / total
         
         return {
-            'contrast': skimage.feature.graycoprops(glcm, 'contrast')[0, 0],
-            'dissimilarity': skimage.feature.graycoprops(glcm, 'dissimilarity')[0, 0],
-            'homogeneity': skimage.feature.graycoprops(glcm, 'homogeneity')[0, 0],
-            'energy': skimage.feature.graycoprops(glcm, 'energy')[0, 0],
-            'correlation': skimage.feature.graycoprops(glcm, 'correlation')[0, 0],
-            'asm': skimage.feature.graycoprops(glcm, 'ASM')[0, 0]
+            'mean': mean,
+            'std': np.sqrt(variance),
+            'median': (levels[lower] + levels[upper]) / 2,
+            'min': levels[nonzero[0]],
+            'max': levels[nonzero[-1]],
+            'energy': np.dot(hist, levels**2),
+            'entropy': -np.sum(p * np.log2(p))
         }
 
     @staticmethod
-    def calculate_shape_moments(image): #calcula momentos de forma da imagem (binarizada)
-        img_array = np.array(image)
-        _, binary_img = cv2.threshold(img_array, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-        moments = cv2.moments(binary_img)
+    def _batch_value_counts(flat): #contagem de cada valor distinto por linha (N, K), completada com zeros
+        n = flat.shape[0]
+        if flat.dtype.kind in 'ui':
+            low = int(flat.min())
+            span = int(flat.max()) - low + 1
+            return ImageOperations._offset_bincount(flat.astype(np.intp) - low, span)
+        
+        #float: ordena cada linha e mede o comprimento de cada sequência de valores iguais
+        ordered = np.sort(flat, axis=1)
+        starts = np.ones(ordered.shape, bool)
+        starts[:, 1:] = ordered[:, 1:] != ordered[:, :-1]
+        positions = np.flatnonzero(starts)
+        lengths = np.diff(np.append(positions, ordered.size))
+        rows = positions // ordered.shape[1]
+        columns = np.arange(positions.size) - np.searchsorted(rows, rows)
+        counts = np.zeros((n, columns.max() + 1), np.int64)
+        counts[rows, columns] = lengths
+        return counts
+
+    @staticmethod
+    def calculate_haralick_features(image, levels=None, batch=False): #calcula características de textura de Haralick usando GLCM
+        img_array = np.asarray(image)
+        if batch:
+            #imagem a imagem em qualquer tamanho: as GLCMs (N, L, L) em float64 da pilha não cabem no cache e
+            #a versão vetorizada perdia para o laço já em 16x16
+            return ImageOperations._stack_results([Descriptors.calculate_haralick_features(img, levels) for img in img_array])
+        levels, quantized = Descriptors._quantize(img_array, levels)
+        
+        #GLCM (distância 1, ângulo 0) por bincount dos pares (pixel, vizinho da direita);
+        #em imagens (H, W, C) os pares de todos os canais entram na mesma contagem
+        counts = ImageOperations.kernels().glcm_counts(quantized, levels) if ImageOperations.use_kernels() else None
+        if counts is None:
+            pairs = quantized[:, :-1] * levels + quantized[:, 1:]
+            counts = np.bincount(pairs.ravel(), minlength=levels * levels)
+        glcm = counts.reshape(levels, levels).astype(np.float64)
+        glcm += glcm.T #simétrica
+        glcm /= glcm.sum() #normalizada
+        
+        #as seis propriedades saem de uma passada só sobre a GLCM (em vez de uma chamada de graycoprops por propriedade)
+        return {key: value[0] for key, value in Descriptors._batch_glcm_props(glcm[np.newaxis]).items()}
+
+    @staticmethod
+    def _glcm_weights(levels): #pesos de contraste, dissimilaridade e homogeneidade para cada célula (i, j), achatados
+        i, j = np.ogrid[:levels, :levels]
+        diff = (i - j).astype(np.float64)
+        return np.stack([diff**2, np.abs(diff), 1.0 / (1.0 + diff**2)]).reshape(3, -1).T.copy()
+
+    @staticmethod
+    def _batch_glcm_props(glcm): #mesmas propriedades do graycoprops para GLCMs (N, L, L) normalizadas, como produtos matriciais
+        n, levels = glcm.shape[:2]
+        flat = glcm.reshape(n, -1)
+        weights = ImageOperations.buffer_pool().get_cached(('glcm_weights', levels), lambda: Descriptors._glcm_weights(levels))
+        contrast, dissimilarity, homogeneity = (flat @ weights).T
+        asm = np.einsum('ij,ij->i', flat, flat)
+        
+        #correlação a partir das marginais (a GLCM é simétrica, então as duas marginais são iguais)
+        index = np.arange(levels, dtype=np.float64)
+        marginal = glcm.sum(axis=2)
+        mean = marginal @ index
+        centered = index[np.newaxis, :] - mean[:, np.newaxis]
+        variance = np.einsum('nl,nl->n', marginal, centered**2)
+        covariance = np.einsum('nl,nlm,nm->n', centered, glcm, centered)
+        correlation = np.ones(n)
+        spread = variance >= 1e-15**2 #mesmo critério do skimage: desvio padrão < 1e-15 dá correlação 1
+        correlation[spread] = covariance[spread] / variance[spread]
+        
+        return {
+            'contrast': contrast,
+            'dissimilarity': dissimilarity,
+            'homogeneity': homogeneity,
+            'energy': np.sqrt(asm),
+            'correlation': correlation,
+            'asm': asm
+        }
+
+    @staticmethod
+    def _quantize(img_array, levels=None): #reduz a imagem a no máximo `levels` níveis (padrão: até 256, conforme a profundidade)
+        if img_array.dtype.kind in 'ui':
+            bits = img_array.dtype.itemsize * 8
+            if levels is None:
+                levels = min(2**bits, 256)
+            values = img_array
+            if img_array.dtype.kind == 'i':
+                values = img_array.astype(np.int64) - np.iinfo(img_array.dtype).min #sem sinal: 0 .. 2**bits - 1
+            if levels >= 2**bits:
+                quantized = values
+            elif levels & (levels - 1) == 0:
+                #potência de 2 (ex.: 16 bits com 256 níveis): descarta os bits menos significativos, no dtype da imagem
+                quantized = values >> (bits - (int(levels).bit_length() - 1))
+            else:
+                quantized = values.astype(np.int64) * levels >> bits #valor * levels // 2**bits: usa todos os níveis
+        else:
+            if levels is None:
+                levels = 256
+            quantized = np.rint(np.clip(img_array, 0, 1) * (levels - 1)) #float em [0, 1]
+        #até 256 níveis o índice do par (a * levels + b) cabe em uint16, o que deixa a contagem mais leve
+        return levels, quantized.astype(np.uint16 if levels <= 256 else np.int64)
+
+    @staticmethod
+    def calculate_shape_moments(image, batch=False): #calcula momentos de forma da imagem (binarizada)
+        img_array = np.asarray(image)
+        if batch and not ImageOperations._vectorize_batch('shape_moments', img_array):
+            return ImageOperations._stack_results([Descriptors.calculate_shape_moments(img) for img in img_array])
+        if batch:
+            return Descriptors._batch_shape_moments(img_array)
+        moments = cv2.moments(Descriptors._binarize(img_array))
         hu_moments = cv2.HuMoments(moments)
         
         return {
@@ -64,4 +192,97 @@ class Descriptors:
                 'mu03': moments['mu03']
             },
             'hu_moments': [hu_moments[i][0] for i in range(7)]
-        }
\ No newline at end of file
+        }
+
+    @staticmethod
+    def _binarize(img_array): #binarização de Otsu (0/255, uint8) usada pelos momentos de forma
+        if img_array.ndim == 3:
+            img_array = img_array.mean(axis=2) #forma calculada sobre a média dos canais
+        
+        if img_array.dtype == np.uint8:
+            _, binary_img = cv2.threshold(img_array, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+            return binary_img
+        #o Otsu do OpenCV só aceita 8 bits; para 16 bits/float o limiar vem do skimage
+        return ((img_array > threshold_otsu(img_array)) * 255).astype(np.uint8)
+
+    @staticmethod
+    def _batch_otsu_8u(flat): #limiar de Otsu do OpenCV (THRESH_OTSU em 8 bits) para cada linha, vetorizado
+        hist = ImageOperations._offset_bincount(flat, 256).astype(np.float64)
+        p = hist / flat.shape[1]
+        levels = np.arange(256)
+        
+        q1 = np.cumsum(p, axis=1)
+        q2 = 1.0 - q1
+        mu = np.sum(p * levels, axis=1, keepdims=True)
+        eps = np.finfo(np.float32).eps
+        valid = (np.minimum(q1, q2) >= eps) & (np.maximum(q1, q2) <= 1.0 - eps)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mu1 = np.cumsum(p * levels, axis=1) / q1
+            mu2 = (mu - q1 * mu1) / q2
+            sigma = q1 * q2 * (mu1 - mu2)**2
+        sigma[~valid] = 0 #o OpenCV só troca o limiar quando a variância cresce (começando de 0)
+        return np.argmax(sigma, axis=1)
+
+    @staticmethod
+    def _batch_shape_moments(img_array): #mesmos momentos de cv2.moments/cv2.HuMoments, calculados para a pilha inteira
+        if img_array.ndim == 4:
+            img_array = img_array.mean(axis=3) #forma calculada sobre a média dos canais
+        n, rows, cols = img_array.shape
+        flat = img_array.reshape(n, -1)
+        
+        if img_array.dtype == np.uint8:
+            threshold = Descriptors._batch_otsu_8u(flat)
+        else:
+            threshold = ImageOperations._batch_otsu_thresholds(img_array)
+        binary = (img_array > threshold[:, np.newaxis, np.newaxis]).astype(np.float64)
+        
+        #momentos espaciais como produtos matriciais: cada linha é ponderada pelas potências de x e depois por y
+        #(a máscara é 0/1 e o fator 255 do cv2.moments entra no final)
+        y = np.arange(rows, dtype=np.float64)
+        x = np.arange(cols, dtype=np.float64)
+        x_powers = np.stack([x**k for k in range(4)], axis=1) #(W, 4)
+        y_powers = np.stack([y**k for k in range(4)], axis=1) #(H, 4)
+        raw = np.matmul(y_powers.T, np.matmul(binary, x_powers)) * 255.0 #(N, 4, 4): raw[n, q, p] = m_pq
+        m00, m10, m20, m30 = raw[:, 0, 0], raw[:, 0, 1], raw[:, 0, 2], raw[:, 0, 3]
+        m01, m11, m21 = raw[:, 1, 0], raw[:, 1, 1], raw[:, 1, 2]
+        m02, m12, m03 = raw[:, 2, 0], raw[:, 2, 1], raw[:, 3, 0]
+        
+        #momentos centrais (mesmas fórmulas do OpenCV)
+        inv_m00 = np.divide(1.0, m00, out=np.zeros_like(m00), where=np.abs(m00) > np.finfo(np.float64).eps)
+        cx, cy = m10 * inv_m00, m01 * inv_m00
+        mu20 = m20 - m10 * cx
+        mu11 = m11 - m10 * cy
+        mu02 = m02 - m01 * cy
+        mu30 = m30 - cx * (3 * mu20 + cx * m10)
+        mu21 = m21 - cx * (2 * mu11 + cx * m01) - cy * mu20
+        mu12 = m12 - cy * (2 * mu11 + cy * m10) - cx * mu02
+        mu03 = m03 - cy * (3 * mu02 + cy * m01)
+        
+        #momentos normalizados e invariantes de Hu
+        s2 = inv_m00 * inv_m00
+        s3 = s2 * np.sqrt(np.abs(inv_m00))
+        nu20, nu11, nu02 = mu20 * s2, mu11 * s2, mu02 * s2
+        nu30, nu21, nu12, nu03 = mu30 * s3, mu21 * s3, mu12 * s3, mu03 * s3
+        
+        t0, t1 = nu30 + nu12, nu21 + nu03
+        q0, q1 = t0 * t0, t1 * t1
+        n4 = 4 * nu11
+        s, d = nu20 + nu02, nu20 - nu02
+        hu = np.empty((n, 7))
+        hu[:, 0] = s
+        hu[:, 1] = d * d + n4 * nu11
+        hu[:, 3] = q0 + q1
+        hu[:, 5] = d * (q0 - q1) + n4 * t0 * t1
+        t0 = t0 * (q0 - 3 * q1)
+        t1 = t1 * (3 * q0 - q1)
+        q0, q1 = nu30 - 3 * nu12, 3 * nu21 - nu03
+        hu[:, 2] = q0 * q0 + q1 * q1
+        hu[:, 4] = q0 * t0 + q1 * t1
+        hu[:, 6] = q1 * t0 - q0 * t1
+        
+        return {
+            'spatial_moments': {'m00': m00, 'm10': m10, 'm01': m01, 'm20': m20, 'm11': m11, 'm02': m02},
+            'central_moments': {'mu20': mu20, 'mu11': mu11, 'mu02': mu02,
+                                'mu30': mu30, 'mu21': mu21, 'mu12': mu12, 'mu03': mu03},
+            'hu_moments': hu
+        }
@@ -0,0 +1,138 @@
+import numpy as np
+from scipy.ndimage import (correlate1d, uniform_filter1d, median_filter, gaussian_filter,
+                          maximum_filter1d, minimum_filter1d, convolve)
+from ImageOperations import ImageOperations, GRADIENT_KERNELS
+
+
+#parâmetro padrão de cada filtro (tamanho da janela, ou sigma no gaussiano), igual ao de ImageOperations.apply_filter
+DEFAULT_PARAMS = {'mean': 3, 'median': 3, 'gaussian': 1, 'max': 3, 'min': 3,
+                  'laplacian': None, 'roberts': None, 'prewitt': None, 'sobel': None}
+
+DERIVATIVE = np.array([-1, 0, 1], np.float32)
+SECOND_DERIVATIVE = np.array([1, -2, 1], np.float32)
+BOX = np.ones(3, np.float32)
+#janelas de máximo/mínimo até este tamanho usam fatias deslocadas (custo proporcional ao tamanho, sem a sobrecarga
+#do filtro do scipy); acima, maximum_filter1d/minimum_filter1d (custo constante por pixel) ganham
+EXTREMA_MAX_SLICES = 21
+
+
+class FilterBank:
+    @staticmethod
+    def apply(image, filters): #aplica vários filtros de uma vez; devolve array float32 (H, W, len(filters)) ou (H, W, C, len(filters))
+        img_array = np.asarray(image)
+        specs = [FilterBank._parse_spec(spec) for spec in filters]
+
+        #a imagem é preenchida uma única vez, com a maior borda que os filtros pedem
+        #(borda 'symmetric' do NumPy = modo 'reflect' padrão do scipy.ndimage)
+        pad = max(FilterBank._radius(name, param) for name, param in specs)
+        pad_width = [(pad, pad)] * 2 + [(0, 0)] * (img_array.ndim - 2) #canais não são preenchidos
+        padded = np.pad(img_array.astype(np.float32), pad_width, mode='symmetric')
+        crop = (slice(pad, pad + img_array.shape[0]), slice(pad, pad + img_array.shape[1]))
+
+        bank = np.empty(img_array.shape + (len(specs),), np.float32)
+        shared = {} #resultados intermediários reaproveitados entre filtros
+        #máximo e mínimo do mesmo tamanho pedidos juntos saem da mesma passada (ver _extrema)
+        shared['extrema_kinds'] = {}
+        for name, param in specs:
+            if name in ['max', 'min']:
+                shared['extrema_kinds'].setdefault(param, set()).add(name)
+        for k, (name, param) in enumerate(specs):
+            if name == 'median' and ImageOperations.use_kernels():
+                #kernel direto na imagem original (borda 'reflect' própria); uint8 com janela >= 5 usa o histograma deslizante
+                if ImageOperations.kernels().rank_filter(img_array, param, (0, 1), 'median', bank[..., k],
+                                                         ImageOperations.buffer_pool()) is not None:
+                    continue
+            bank[..., k] = FilterBank._response(padded, name, param, shared)[crop]
+        return bank
+
+    @staticmethod
+    def extract_features(image, filters): #uma linha de características por pixel: (H * W, len(filters)), para classificadores
+        bank = FilterBank.apply(image, filters)
+        return bank.reshape(-1, bank.shape[-1])
+
+    @staticmethod
+    def _parse_spec(spec): #aceita 'sobel' ou ('mean', 5)
+        if isinstance(spec, str):
+            name, param = spec, None
+        else:
+            name, param = spec
+        if name not in DEFAULT_PARAMS:
+            raise ValueError("Filtro desconhecido")
+        if param is None:
+            param = DEFAULT_PARAMS[name]
+        if name in ['mean', 'median', 'max', 'min'] and (param < 1 or param % 2 == 0):
+            raise ValueError("O tamanho da janela deve ser um número ímpar positivo")
+        return name, param
+
+    @staticmethod
+    def _radius(name, param):
+        if name == 'gaussian':
+            return int(4.0 * param + 0.5) #mesmo truncamento do gaussian_filter
+        if name in ['mean', 'median', 'max', 'min']:
+            return param // 2
+        return 1
+
+    @staticmethod
+    def _shared(shared, key, compute):
+        if key not in shared:
+            shared[key] = compute()
+        return shared[key]
+
+    @staticmethod
+    def _extrema(padded, size, kinds): #{'max': ..., 'min': ...} (só os pedidos) da janela size x size, separável
+        if size > EXTREMA_MAX_SLICES:
+            filters = {'max': maximum_filter1d, 'min': minimum_filter1d}
+            return {kind: filters[kind](filters[kind](padded, size, axis=0), size, axis=1) for kind in kinds}
+        rows = FilterBank._extrema_1d({kind: padded for kind in kinds}, size, axis=0)
+        return FilterBank._extrema_1d(rows, size, axis=1)
+
+    @staticmethod
+    def _extrema_1d(sources, size, axis): #uma passada ao longo de axis: cada fatia deslocada serve ao máximo e ao mínimo
+        #só o interior (sem size // 2 de cada borda) é calculado; a borda do preenchimento é descartada no recorte
+        valid = next(iter(sources.values())).shape[axis] - size + 1
+        window = lambda a, k: a[(slice(None),) * axis + (slice(k, k + valid),)]
+        reduce = {'max': np.maximum, 'min': np.minimum}
+        results = {kind: np.empty_like(source) for kind, source in sources.items()}
+        inner = {kind: window(result, size // 2) for kind, result in results.items()}
+        for kind, source in sources.items():
+            np.copyto(inner[kind], window(source, 0))
+        for k in range(1, size):
+            for kind, source in sources.items():
+                reduce[kind](inner[kind], window(source, k), out=inner[kind])
+        return results
+
+    @staticmethod
+    def _response(padded, name, param, shared): #resposta de um filtro calculada sobre a imagem já preenchida
+        get = lambda key, compute: FilterBank._shared(shared, key, compute)
+
+        #somas de caixa 3-tap por eixo: servem à média 3x3 e às passadas separáveis de prewitt/sobel
+        box0 = lambda: get('box0', lambda: correlate1d(padded, BOX, axis=0))
+        box1 = lambda: get('box1', lambda: correlate1d(padded, BOX, axis=1))
+
+        if name == 'mean':
+            if param == 3:
+                return correlate1d(box0(), BOX, axis=1) / 9
+            return uniform_filter1d(uniform_filter1d(padded, param, axis=0), param, axis=1)
+        elif name == 'median':
+            return median_filter(padded, size=ImageOperations._spatial_shape(param, padded.ndim, (0, 1)))
+        elif name == 'gaussian':
+            return gaussian_filter(padded, sigma=ImageOperations._spatial_shape(param, padded.ndim, (0, 1), other=0))
+        elif name in ['max', 'min']:
+            kinds = shared['extrema_kinds'][param]
+            return get(('extrema', param), lambda: FilterBank._extrema(padded, param, kinds))[name]
+        elif name == 'laplacian':
+            return correlate1d(padded, SECOND_DERIVATIVE, axis=0) + correlate1d(padded, SECOND_DERIVATIVE, axis=1)
+        elif name == 'roberts':
+            kernel_x, kernel_y = (ImageOperations._expand_kernel(k.astype(np.float32), padded.ndim, (0, 1))
+                                  for k in GRADIENT_KERNELS['roberts'])
+            return np.hypot(convolve(padded, kernel_x), convolve(padded, kernel_y))
+
+        #prewitt e sobel são separáveis e compartilham as mesmas passadas:
+        #prewitt = derivada sobre a soma de caixa; sobel = prewitt + derivada, pois [1, 2, 1] = [1, 1, 1] + [0, 1, 0]
+        prewitt_x = get('prewitt_x', lambda: correlate1d(box0(), DERIVATIVE, axis=1))
+        prewitt_y = get('prewitt_y', lambda: correlate1d(box1(), DERIVATIVE, axis=0))
+        if name == 'prewitt':
+            return np.hypot(prewitt_x, prewitt_y)
+        dx = get('dx', lambda: correlate1d(padded, DERIVATIVE, axis=1))
+        dy = get('dy', lambda: correlate1d(padded, DERIVATIVE, axis=0))
+        return np.hypot(prewitt_x + dx, prewitt_y + dy)
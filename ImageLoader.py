@@ -0,0 +1,125 @@
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from PIL import Image, ImageOps
+
+
+ARRAY_EXTENSIONS = ('.npy',)
+RAW_EXTENSIONS = ('.raw', '.bin')
+
+
+class ImageLoader:
+    #carregador em lote: decodifica em threads (os decodificadores do PIL liberam o GIL) enquanto o chamador processa
+    def __init__(self, workers=4, depth=8, max_size=None, loader=None):
+        self.workers = workers
+        self.depth = depth #quantas imagens podem estar decodificadas/em decodificação à frente do consumidor
+        self.loader = loader or (lambda path: ImageLoader.load_array(path, max_size))
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.stats = {
+            'images': 0,
+            'pixels': 0,
+            'decode_time': 0.0, #tempo somado das threads decodificando
+            'wait_time': 0.0, #tempo em que o consumidor ficou parado esperando a decodificação
+            'process_time': 0.0 #tempo do consumidor entre uma imagem e a próxima (processamento)
+        }
+
+    def iter_images(self, paths): #gera (caminho, array) na ordem de paths, com leitura antecipada em paralelo
+        paths = iter(paths)
+        pending = deque()
+        executor = ThreadPoolExecutor(max_workers=self.workers)
+
+        try:
+            for path in paths:
+                pending.append((path, executor.submit(self._timed_load, path)))
+                if len(pending) >= self.depth:
+                    break
+
+            while pending:
+                path, future = pending.popleft()
+                start = time.perf_counter()
+                image, decode_time = future.result()
+                self.stats['wait_time'] += time.perf_counter() - start
+                #contado só quando entregue: imagens lidas antecipadamente e descartadas (break do chamador) não entram
+                rows, cols = np.shape(image)[:2]
+                self.stats['images'] += 1
+                self.stats['pixels'] += rows * cols
+                self.stats['decode_time'] += decode_time
+
+                next_path = next(paths, None)
+                if next_path is not None:
+                    pending.append((next_path, executor.submit(self._timed_load, next_path)))
+
+                start = time.perf_counter()
+                yield path, image
+                self.stats['process_time'] += time.perf_counter() - start
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def report(self): #vazão de decodificação e de processamento medidas separadamente
+        stats = self.stats
+        images = stats['images']
+        busy = stats['wait_time'] + stats['process_time']
+        return {
+            'images': images,
+            'decode_images_per_sec': images / stats['decode_time'] if stats['decode_time'] else 0.0, #por thread
+            'decode_mpixels_per_sec': stats['pixels'] / 1e6 / stats['decode_time'] if stats['decode_time'] else 0.0,
+            'process_images_per_sec': images / stats['process_time'] if stats['process_time'] else 0.0,
+            'stall_fraction': stats['wait_time'] / busy if busy else 0.0 #fração do tempo do consumidor parado no I/O
+        }
+
+    def _timed_load(self, path): #(imagem, tempo de decodificação); as estatísticas são somadas por iter_images ao entregar
+        start = time.perf_counter()
+        image = self.loader(path)
+        return image, time.perf_counter() - start
+
+    @staticmethod
+    def load_grayscale(path, max_size=None): #decodifica direto em tons de cinza quando o codec permite
+        image = Image.open(path)
+
+        if image.format == 'JPEG':
+            #modo draft: o decodificador entrega só a luminância e, com max_size, já reduz na DCT (1/2, 1/4, 1/8)
+            image.draft('L', max_size or image.size)
+        elif max_size is not None:
+            factor = min(image.size[0] // max_size[0], image.size[1] // max_size[1])
+            if factor > 1:
+                if image.mode in ('1', 'P') or image.mode.startswith('I;16'):
+                    image = ImageOps.grayscale(image) #modos que o reduce não aceita: converte antes de reduzir
+                image = image.reduce(factor)
+
+        if image.mode != 'L':
+            image = ImageOps.grayscale(image)
+        image.load()
+        return image
+
+    @staticmethod
+    def load_native(path): #ndarray sem perder dados: mantém canais (H, W, C) e profundidade (16 bits, float)
+        extension = os.path.splitext(path)[1].lower()
+        if extension in ARRAY_EXTENSIONS:
+            return np.load(path, mmap_mode='r')
+        image = Image.open(path)
+        if image.mode in ('P', '1', 'LA', 'PA'):
+            image = image.convert('RGBA' if 'A' in image.mode or 'transparency' in image.info else 'RGB')
+        elif image.mode == 'I':
+            #PNG de 16 bits abre como 'I' (int32); volta para uint16 quando os valores cabem
+            img_array = np.asarray(image)
+            if img_array.min() >= 0 and img_array.max() <= 65535:
+                return img_array.astype(np.uint16)
+            return img_array
+        return np.asarray(image)
+
+    @staticmethod
+    def load_array(path, max_size=None): #ndarray 2D; .npy é mapeado em memória (sem cópia), os demais formatos são decodificados
+        extension = os.path.splitext(path)[1].lower()
+        if extension in ARRAY_EXTENSIONS:
+            return np.load(path, mmap_mode='r')
+        if extension in RAW_EXTENSIONS:
+            raise ValueError("Arquivos raw precisam de shape e dtype: use ImageLoader.load_raw")
+        return np.asarray(ImageLoader.load_grayscale(path, max_size))
+
+    @staticmethod
+    def load_raw(path, shape, dtype=np.uint8, offset=0): #pixels crus sem cabeçalho, mapeados em memória (sem cópia)
+        return np.memmap(path, dtype=dtype, mode='r', shape=tuple(shape), offset=offset)
@@ -1,99 +1,241 @@
+import threading
+import importlib.util
 import numpy as np
 from PIL import Image
 from scipy.ndimage import (uniform_filter, median_filter, gaussian_filter,
                           maximum_filter, minimum_filter, convolve)
-from scipy.fft import fft2, ifft2, fftshift, ifftshift
+from scipy.fft import fft2, ifft2, ifftshift
 import cv2
 from skimage import exposure, morphology, filters
-from skimage.morphology import erosion, dilation, square
+from skimage.morphology import erosion, dilation
 from skimage.filters import threshold_otsu
+from BufferPool import BufferPool, DEFAULT_MAX_BYTES
+
+
+LAPLACIAN_KERNEL = np.array([[0, 1, 0], [1, -4, 1], [0, 1, 0]])
+GRADIENT_KERNELS = {
+    'roberts': (np.array([[1, 0], [0, -1]]), np.array([[0, 1], [-1, 0]])),
+    'prewitt': (np.array([[-1, 0, 1], [-1, 0, 1], [-1, 0, 1]]), np.array([[-1, -1, -1], [0, 0, 0], [1, 1, 1]])),
+    'sobel': (np.array([[-1, 0, 1], [-2, 0, 2], [-1, 0, 1]]), np.array([[-1, -2, -1], [0, 0, 0], [1, 2, 1]]))
+}
+
+#numba é opcional e o import dele (com a preparação do cache de compilação) é caro: NumbaKernels só é importado
+#quando o backend numba é pedido (ImageOperations.kernels)
+NUMBA_INSTALLED = importlib.util.find_spec('numba') is not None
+
+#batch=True só usa o caminho vetorizado em imagens com menos pixels que estes limites; acima deles os temporários
+#por pixel da pilha (índices intp, float64) custam mais que as chamadas Python economizadas e a pilha é processada
+#imagem a imagem. medidos com Benchmark.py em pilhas de 16² a 512²; None = o vetorizado ganha em todos os tamanhos
+BATCH_MAX_PIXELS = {
+    'filter': 128 * 128,
+    'frequency_filter': 96 * 96,
+    'fourier_spectrum': 48 * 48,
+    'otsu': 96 * 96,
+    'morphology': 192 * 192,
+    'contrast_stretching': 64 * 64,
+    'histogram_equalization': None,
+    'histogram': 40 * 40,
+    'intensity_stats': None,
+    'shape_moments': 56 * 56
+}
 
 
 class ImageOperations:
+    _local = threading.local() #um BufferPool por thread: chamadas em threads diferentes não dividem buffers
+    backend = 'numpy' #'numpy' (scipy/skimage/NumPy) ou 'numba' (kernels de NumbaKernels nos laços de pixel)
+    pool_max_bytes = DEFAULT_MAX_BYTES #limite de cada pool de thread (ver set_pool_limit)
+
+    #todas as operações aceitam PIL.Image ou ndarray (H, W) / (H, W, C) em uint8, uint16 ou float;
+    #a saída segue o tipo da entrada (PIL -> PIL, ndarray -> ndarray) e out_dtype escolhe o dtype (padrão: o da entrada).
+    #com batch=True o eixo 0 é uma pilha de imagens do mesmo tamanho, (N, H, W) ou (N, H, W, C), processada de uma vez;
+    #o resultado é o mesmo de chamar a operação imagem por imagem
+
     @staticmethod
-    def apply_otsu(image): #aplica limiarização de Otsu para binarização da imagem
-        img_array = np.array(image)
-        threshold = threshold_otsu(img_array)
-        binary_img = img_array > threshold
-        return Image.fromarray((binary_img * 255).astype(np.uint8)), threshold
+    def buffer_pool(): #buffers de trabalho da thread atual, usados por apply_filter, frequency_filter e _normalize_image
+        pool = getattr(ImageOperations._local, 'pool', None)
+        if pool is None:
+            pool = ImageOperations._local.pool = BufferPool(ImageOperations.pool_max_bytes)
+        return pool
 
     @staticmethod
-    def contrast_stretching(image): #realiza estiramento de contraste usando percentis 2% e 98%
-        img_array = np.array(image)
-        p2, p98 = np.percentile(img_array, (2, 98))
-        img_rescale = exposure.rescale_intensity(img_array, in_range=(p2, p98))
-        return Image.fromarray(img_rescale)
+    def set_pool_limit(max_bytes): #limite em bytes dos pools: vale para o pool da thread atual e para os criados depois
+        ImageOperations.pool_max_bytes = max_bytes
+        ImageOperations.buffer_pool().max_bytes = max_bytes
 
     @staticmethod
-    def histogram_equalization(image): #equaliza o histograma da imagem para melhorar contraste
-        img_array = np.array(image)
-        img_eq = exposure.equalize_hist(img_array)
-        img_eq = (255 * img_eq).astype(np.uint8)
-        return Image.fromarray(img_eq)
+    def set_backend(name): #'numpy', 'numba' ou 'auto'; sem numba instalado fica em 'numpy'. devolve o backend em uso
+        if name not in ('numpy', 'numba', 'auto'):
+            raise ValueError("Backend desconhecido")
+        use_numba = name != 'numpy' and NUMBA_INSTALLED and ImageOperations.kernels().available()
+        ImageOperations.backend = 'numba' if use_numba else 'numpy'
+        if use_numba:
+            ImageOperations.kernels().start_threads()
+        return ImageOperations.backend
 
     @staticmethod
-    def apply_filter(image, filter_type): #aplica filtros espaciais (passa-baixa ou passa-alta)
-        img_array = np.array(image)
+    def kernels(): #classe NumbaKernels, importada na primeira chamada
+        from NumbaKernels import NumbaKernels
+        return NumbaKernels
+
+    @staticmethod
+    def use_kernels(): #kernels compilados só com o backend numba e fora do aquecimento em segundo plano
+        return ImageOperations.backend == 'numba' and ImageOperations.kernels().is_ready()
+
+    @staticmethod
+    def apply_otsu(image, out_dtype=None, batch=False): #aplica limiarização de Otsu para binarização da imagem
+        img_array = np.asarray(image)
+        if batch and not ImageOperations._vectorize_batch('otsu', img_array):
+            return ImageOperations._stack_results([ImageOperations.apply_otsu(img, out_dtype) for img in img_array])
+        if batch:
+            threshold = ImageOperations._batch_otsu_thresholds(img_array) #um limiar por imagem
+            binary_img = img_array > ImageOperations._per_image(threshold, img_array)
+        else:
+            threshold = threshold_otsu(img_array.ravel()) #limiar global sobre todos os canais
+            binary_img = img_array > threshold
+        out_dtype = ImageOperations._output_dtype(img_array, out_dtype)
+        return ImageOperations._wrap(ImageOperations._from_unit(binary_img, out_dtype), image), threshold
+
+    @staticmethod
+    def contrast_stretching(image, out_dtype=None, batch=False): #realiza estiramento de contraste usando percentis 2% e 98%
+        img_array = np.asarray(image)
+        if batch and not ImageOperations._vectorize_batch('contrast_stretching', img_array):
+            return ImageOperations._stack_results([ImageOperations.contrast_stretching(img, out_dtype) for img in img_array])
+        out_dtype = ImageOperations._output_dtype(img_array, out_dtype)
+        if batch:
+            return ImageOperations._batch_contrast_stretching(img_array, out_dtype)
         
+        p2, p98 = np.percentile(img_array, (2, 98))
+        if out_dtype.kind == 'f':
+            img_rescale = exposure.rescale_intensity(img_array, in_range=(p2, p98), out_range=(0.0, 1.0)).astype(out_dtype)
+        else:
+            img_rescale = exposure.rescale_intensity(img_array, in_range=(p2, p98), out_range=out_dtype.name)
+        return ImageOperations._wrap(img_rescale, image)
+
+    @staticmethod
+    def histogram_equalization(image, out_dtype=None, batch=False): #equaliza o histograma da imagem para melhorar contraste
+        img_array = np.asarray(image)
+        if batch and not ImageOperations._vectorize_batch('histogram_equalization', img_array):
+            return ImageOperations._stack_results([ImageOperations.histogram_equalization(img, out_dtype) for img in img_array])
+        if batch:
+            img_eq = ImageOperations._batch_equalize_hist(img_array)
+        else:
+            img_eq = exposure.equalize_hist(img_array)
+        out_dtype = ImageOperations._output_dtype(img_array, out_dtype)
+        return ImageOperations._wrap(ImageOperations._from_unit(img_eq, out_dtype), image)
+
+    @staticmethod
+    def apply_filter(image, filter_type, out_dtype=None, batch=False): #aplica filtros espaciais (passa-baixa ou passa-alta)
+        img_array = np.asarray(image)
+        out = np.empty(img_array.shape, ImageOperations._output_dtype(img_array, out_dtype)) #saída própria, fora do pool
+        return ImageOperations._wrap(ImageOperations.apply_filter_array(img_array, filter_type, out=out, batch=batch), image)
+
+    @staticmethod
+    def apply_filter_array(img_array, filter_type, out=None, out_dtype=None, batch=False): #mesmo que apply_filter, mas sobre arrays e sem alocar em regime
+        #sem `out`, o resultado é um buffer do pool da thread: só vale até a próxima chamada de apply_filter_array nela
+        if batch and not ImageOperations._vectorize_batch('filter', img_array):
+            if out is None:
+                out = ImageOperations.buffer_pool().get(img_array.shape, ImageOperations._output_dtype(img_array, out_dtype), 'filter_output')
+            for img, img_out in zip(img_array, out):
+                ImageOperations.apply_filter_array(img, filter_type, out=img_out)
+            return out
         if filter_type in ['mean', 'median', 'gaussian', 'max', 'min']:
-            filtered_img = ImageOperations._apply_lowpass_filter(img_array, filter_type)
+            filtered_img = ImageOperations._apply_lowpass_filter(img_array, filter_type, batch)
         elif filter_type in ['laplacian', 'roberts', 'prewitt', 'sobel']:
-            filtered_img = ImageOperations._apply_highpass_filter(img_array, filter_type)
+            filtered_img = ImageOperations._apply_highpass_filter(img_array, filter_type, batch)
         else:
             raise ValueError("Filtro desconhecido")
         
-        filtered_img = ImageOperations._normalize_image(filtered_img)
-        return Image.fromarray(filtered_img)
+        out_dtype = ImageOperations._output_dtype(img_array, out_dtype)
+        return ImageOperations._normalize_image(filtered_img, out, out_dtype, batch, 'filter_output')
 
     @staticmethod
-    def _apply_lowpass_filter(img_array, filter_type): #aplica filtros passa-baixa (suavização)
+    def _apply_lowpass_filter(img_array, filter_type, batch=False): #aplica filtros passa-baixa (suavização)
+        pool = ImageOperations.buffer_pool()
+        axes = ImageOperations._spatial_axes(img_array, batch)
+        #tamanho 1 nos eixos de canal/pilha: todas as imagens e canais numa chamada só
+        size = ImageOperations._spatial_shape(3, img_array.ndim, axes)
+        
+        #mediana, máximo e mínimo são exatos no dtype original; média e gaussiano precisam de precisão extra
+        if filter_type in ['median', 'max', 'min']:
+            output = pool.get(img_array.shape, img_array.dtype, 'filtered')
+        else:
+            output = pool.get(img_array.shape, ImageOperations._work_dtype(img_array.dtype), 'filtered')
+        
+        if filter_type in ['median', 'max', 'min'] and ImageOperations.use_kernels():
+            filtered = ImageOperations.kernels().rank_filter(img_array, 3, axes, filter_type, output, pool)
+            if filtered is not None: #None: dtype sem kernel, segue no scipy
+                return filtered
+        
         if filter_type == 'mean':
-            return uniform_filter(img_array, size=3)
+            return uniform_filter(img_array, size=size, output=output)
         elif filter_type == 'median':
-            return median_filter(img_array, size=3)
+            return median_filter(img_array, size=size, output=output)
         elif filter_type == 'gaussian':
-            return gaussian_filter(img_array, sigma=1)
+            sigma = ImageOperations._spatial_shape(1, img_array.ndim, axes, other=0)
+            return gaussian_filter(img_array, sigma=sigma, output=output)
         elif filter_type == 'max':
-            return maximum_filter(img_array, size=3)
+            return maximum_filter(img_array, size=size, output=output)
         elif filter_type == 'min':
-            return minimum_filter(img_array, size=3)
+            return minimum_filter(img_array, size=size, output=output)
 
     @staticmethod
-    def _apply_highpass_filter(img_array, filter_type): #aplica filtros passa-alta (detecção de bordas)
+    def _apply_highpass_filter(img_array, filter_type, batch=False): #aplica filtros passa-alta (detecção de bordas)
+        pool = ImageOperations.buffer_pool()
+        axes = ImageOperations._spatial_axes(img_array, batch)
+        work_dtype = ImageOperations._work_dtype(img_array.dtype) #sem overflow (ex.: uint8 com valores negativos)
+        
         if filter_type == 'laplacian':
-            kernel = np.array([[0, 1, 0], [1, -4, 1], [0, 1, 0]])
-            return convolve(img_array, kernel)
-        
-        elif filter_type == 'roberts':
-            kernel_x = np.array([[1, 0], [0, -1]])
-            kernel_y = np.array([[0, 1], [-1, 0]])
-            gx = convolve(img_array, kernel_x)
-            gy = convolve(img_array, kernel_y)
-            return np.sqrt(gx**2 + gy**2)
-        
-        elif filter_type == 'prewitt':
-            kernel_x = np.array([[-1, 0, 1], [-1, 0, 1], [-1, 0, 1]])
-            kernel_y = np.array([[-1, -1, -1], [0, 0, 0], [1, 1, 1]])
-            gx = convolve(img_array, kernel_x)
-            gy = convolve(img_array, kernel_y)
-            return np.sqrt(gx**2 + gy**2)
-        
-        elif filter_type == 'sobel':
-            kernel_x = np.array([[-1, 0, 1], [-2, 0, 2], [-1, 0, 1]])
-            kernel_y = np.array([[-1, -2, -1], [0, 0, 0], [1, 2, 1]])
-            gx = convolve(img_array, kernel_x)
-            gy = convolve(img_array, kernel_y)
-            return np.sqrt(gx**2 + gy**2)
-
-    @staticmethod
-    def frequency_filter(image, filter_type): #aplica filtros no domínio da frequência (ideal ou gaussiano)
-        img_array = np.array(image)
-        
-        #transformada de Fourier
-        f_transform = fft2(img_array)
-        f_shift = fftshift(f_transform) #desloca as baixas frequências para o centro
-        
-        rows, cols = img_array.shape
+            output = pool.get(img_array.shape, work_dtype, 'filtered')
+            return convolve(img_array, ImageOperations._expand_kernel(LAPLACIAN_KERNEL, img_array.ndim, axes), output=output)
+        
+        #roberts, prewitt e sobel: magnitude do gradiente calculada in-place (sem temporários)
+        kernel_x, kernel_y = (ImageOperations._expand_kernel(k, img_array.ndim, axes) for k in GRADIENT_KERNELS[filter_type])
+        gx = convolve(img_array, kernel_x, output=pool.get(img_array.shape, work_dtype, 'gx'))
+        gy = convolve(img_array, kernel_y, output=pool.get(img_array.shape, work_dtype, 'gy'))
+        np.multiply(gx, gx, out=gx)
+        np.multiply(gy, gy, out=gy)
+        np.add(gx, gy, out=gx)
+        return np.sqrt(gx, out=gx)
+
+    @staticmethod
+    def frequency_filter(image, filter_type, out_dtype=None, batch=False): #aplica filtros no domínio da frequência (ideal ou gaussiano)
+        img_array = np.asarray(image)
+        out = np.empty(img_array.shape, ImageOperations._output_dtype(img_array, out_dtype))
+        return ImageOperations._wrap(ImageOperations.frequency_filter_array(img_array, filter_type, out=out, batch=batch), image)
+
+    @staticmethod
+    def frequency_filter_array(img_array, filter_type, out=None, out_dtype=None, batch=False): #mesmo que frequency_filter, sobre arrays e com FFT in-place
+        #sem `out`, o resultado é um buffer do pool da thread: só vale até a próxima chamada de frequency_filter_array nela
+        pool = ImageOperations.buffer_pool()
+        if batch and not ImageOperations._vectorize_batch('frequency_filter', img_array):
+            if out is None:
+                out = pool.get(img_array.shape, ImageOperations._output_dtype(img_array, out_dtype), 'frequency_output')
+            for img, img_out in zip(img_array, out):
+                ImageOperations.frequency_filter_array(img, filter_type, out=img_out)
+            return out
+        axes = ImageOperations._spatial_axes(img_array, batch)
+        rows, cols = img_array.shape[axes[0]], img_array.shape[axes[1]]
+        
+        #transformada de Fourier feita dentro de um buffer complexo reaproveitado (todas as imagens/canais de uma vez,
+        #com uma única máscara compartilhada)
+        spectrum = pool.get(img_array.shape, np.complex128, 'spectrum')
+        np.copyto(spectrum, img_array)
+        spectrum = fft2(spectrum, axes=axes, overwrite_x=True)
+        
+        #a máscara já vem com ifftshift aplicado, o que dispensa o fftshift/ifftshift do espectro
+        mask = pool.get_cached(('frequency_mask', filter_type, rows, cols),
+                               lambda: ifftshift(ImageOperations._frequency_mask(rows, cols, filter_type)))
+        
+        #aplica o filtro e transformada inversa
+        np.multiply(spectrum, ImageOperations._expand_kernel(mask, img_array.ndim, axes), out=spectrum)
+        spectrum = ifft2(spectrum, axes=axes, overwrite_x=True)
+        img_back = np.abs(spectrum, out=pool.get(img_array.shape, np.float64, 'magnitude'))
+        
+        out_dtype = ImageOperations._output_dtype(img_array, out_dtype)
+        return ImageOperations._normalize_image(img_back, out, out_dtype, batch, 'frequency_output')
+
+    @staticmethod
+    def _frequency_mask(rows, cols, filter_type): #máscara centrada (baixas frequências no centro)
         crow, ccol = rows // 2, cols // 2 #centro da imagem
         mask = np.zeros((rows, cols), np.float32) #máscara de filtro
         
@@ -115,24 +257,25 @@ class ImageOperations:
                 y, x = np.ogrid[:rows, :cols]
                 mask = 1 - np.exp(-((x - ccol)**2 + (y - crow)**2) / (2 * sigma**2)) 
         
-        #aplica o filtro e transformada inversa
-        f_filtered = f_shift * mask
-        f_ishift = ifftshift(f_filtered)
-        img_back = np.abs(ifft2(f_ishift)) #transformada inversa
-        
-        return Image.fromarray(ImageOperations._normalize_image(img_back))
+        return mask
 
     @staticmethod
-    def apply_morphology(image, operation): #aplica operações morfológicas em imagens binárias
-        img_array = np.array(image)
+    def apply_morphology(image, operation, out_dtype=None, batch=False): #aplica operações morfológicas em imagens binárias
+        img_array = np.asarray(image)
+        if batch and not ImageOperations._vectorize_batch('morphology', img_array):
+            return ImageOperations._stack_results([ImageOperations.apply_morphology(img, operation, out_dtype) for img in img_array])
         
-        if img_array.dtype != bool:
-            threshold = threshold_otsu(img_array)
-            binary_img = img_array > threshold
-        else:
+        if img_array.dtype == bool:
             binary_img = img_array
+        elif batch:
+            binary_img = img_array > ImageOperations._per_image(ImageOperations._batch_otsu_thresholds(img_array), img_array)
+        else:
+            threshold = threshold_otsu(img_array.ravel())
+            binary_img = img_array > threshold
             
-        footprint = square(3) #elemento estruturante 3x3 (embora o VS falou que square tá desatualizado (?))
+        #elemento estruturante 3x3 (tamanho 1 nos eixos de canal/pilha)
+        axes = ImageOperations._spatial_axes(img_array, batch)
+        footprint = np.ones(ImageOperations._spatial_shape(3, img_array.ndim, axes), bool)
         
         if operation == 'erosion':
             result = erosion(binary_img, footprint)
@@ -145,27 +288,285 @@ class ImageOperations:
         else:
             raise ValueError("Operação desconhecida")
         
-        return Image.fromarray((result * 255).astype(np.uint8))
+        out_dtype = ImageOperations._output_dtype(img_array, out_dtype)
+        return ImageOperations._wrap(ImageOperations._from_unit(result, out_dtype), image)
 
     @staticmethod
-    def _normalize_image(img_array):
-        img_array = img_array - img_array.min()
-        if img_array.max() > 0:
-            img_array = img_array / img_array.max() * 255
-        return img_array.astype(np.uint8)
+    def _normalize_image(img_array, out=None, out_dtype=np.uint8, batch=False, out_name=None): #reescala para a faixa do dtype de saída com ufuncs in-place
+        #sem `out`: com out_name, buffer do pool com esse nome (cada API pública usa o seu); sem nome, array novo
+        pool = ImageOperations.buffer_pool()
+        work_dtype = img_array.dtype if img_array.dtype.kind == 'f' else np.float64
+        work = pool.get(img_array.shape, work_dtype, 'normalize')
+        if out is None:
+            out = pool.get(img_array.shape, out_dtype, out_name) if out_name else np.empty(img_array.shape, out_dtype)
+        
+        #em lote, mínimo e máximo são de cada imagem (formato (N, 1, 1, ...))
+        axes = ImageOperations._image_axes(img_array) if batch else None
+        np.subtract(img_array, img_array.min(axis=axes, keepdims=batch), out=work)
+        peak = work.max(axis=axes, keepdims=batch)
+        peak = np.where(peak > 0, peak, 1) #imagem constante: fica toda em zero
+        np.divide(work, peak, out=work)
+        if out.dtype.kind != 'f':
+            np.multiply(work, ImageOperations._dtype_peak(out.dtype), out=work)
+        
+        np.copyto(out, work, casting='unsafe')
+        return out
+
+    @staticmethod
+    def _vectorize_batch(operation, img_array): #pilha pequena o bastante para o caminho vetorizado (ver BATCH_MAX_PIXELS)
+        limit = BATCH_MAX_PIXELS[operation]
+        return limit is None or img_array.shape[1] * img_array.shape[2] < limit
 
     @staticmethod
-    def calculate_histogram(image):
-        img_array = np.array(image)
+    def _stack_results(results): #resultados imagem a imagem -> mesmo formato do caminho em lote (arrays (N, ...))
+        first = results[0]
+        if isinstance(first, dict):
+            return {key: ImageOperations._stack_results([result[key] for result in results]) for key in first}
+        if isinstance(first, tuple):
+            return tuple(ImageOperations._stack_results(list(values)) for values in zip(*results))
+        return np.array(results)
+
+    @staticmethod
+    def _spatial_axes(img_array, batch=False): #eixos de linhas e colunas; os demais (pilha, canais) são processados em lote
+        return (1, 2) if batch else (0, 1)
+
+    @staticmethod
+    def _image_axes(img_array): #em lote: todos os eixos de uma imagem (tudo menos o eixo 0)
+        return tuple(range(1, img_array.ndim))
+
+    @staticmethod
+    def _per_image(values, img_array): #(N,) -> (N, 1, 1, ...) para combinar com a pilha
+        return np.reshape(values, (-1,) + (1,) * (img_array.ndim - 1))
+
+    @staticmethod
+    def _spatial_shape(value, ndim, axes, other=1): #ex.: 3 -> (3, 3, 1) para imagens (H, W, C)
+        shape = [other] * ndim
+        for axis in axes:
+            shape[axis] = value
+        return tuple(shape)
+
+    @staticmethod
+    def _expand_kernel(kernel, ndim, axes): #kernel 2D com eixos de tamanho 1 nas posições de canal
+        shape = [1] * ndim
+        shape[axes[0]], shape[axes[1]] = kernel.shape
+        return kernel.reshape(shape)
+
+    @staticmethod
+    def _work_dtype(dtype): #precisão intermediária: float64 se a entrada já for float64, senão float32
+        return np.dtype(np.float64) if dtype == np.float64 else np.dtype(np.float32)
+
+    @staticmethod
+    def _output_dtype(img_array, out_dtype):
+        if out_dtype is not None:
+            return np.dtype(out_dtype)
+        if img_array.dtype == bool:
+            return np.dtype(np.uint8)
+        return img_array.dtype
+
+    @staticmethod
+    def _dtype_peak(dtype): #valor máximo da faixa de saída: 255 em uint8, 65535 em uint16, 1.0 em float
+        dtype = np.dtype(dtype)
+        return np.iinfo(dtype).max if dtype.kind in 'ui' else 1.0
+
+    @staticmethod
+    def _from_unit(img_array, out_dtype): #converte valores em [0, 1] (ou booleanos) para a faixa do dtype de saída
+        if out_dtype.kind == 'f':
+            return img_array.astype(out_dtype)
+        return (ImageOperations._dtype_peak(out_dtype) * img_array).astype(out_dtype)
+
+    @staticmethod
+    def _wrap(img_array, image): #PIL.Image de entrada -> PIL.Image de saída; ndarray -> ndarray
+        if isinstance(image, Image.Image):
+            return Image.fromarray(img_array)
+        return img_array
+
+    @staticmethod
+    def _value_range(dtype): #faixa de valores usada nos histogramas de 256 bins
+        dtype = np.dtype(dtype)
+        if dtype.kind in 'ui':
+            return np.iinfo(dtype).min, np.iinfo(dtype).max + 1
+        return 0.0, 1.0
+
+    @staticmethod
+    def histogram_bin_values(dtype): #valor (limite inferior) de cada um dos 256 bins de calculate_histogram para o dtype
+        low, high = ImageOperations._value_range(dtype)
+        return low + np.arange(256) * ((high - low) / 256)
+
+    @staticmethod
+    def calculate_histogram(image, batch=False): #histograma de 256 bins em uma única passada (bincount) sobre os pixels
+        img_array = np.asarray(image)
+        if batch and not ImageOperations._vectorize_batch('histogram', img_array):
+            return ImageOperations._stack_results([ImageOperations.calculate_histogram(img) for img in img_array])
+        if batch:
+            return ImageOperations._batch_histogram(img_array)
         
-        hist, _ = np.histogram(img_array.flatten(), bins=256, range=[0,256])
+        if img_array.dtype == np.uint8:
+            return np.bincount(img_array.ravel(), minlength=256)
+        if img_array.dtype == np.uint16:
+            return np.bincount(img_array.ravel() >> 8, minlength=256) #bins de largura 256
+        hist, _ = np.histogram(img_array.ravel(), bins=256, range=ImageOperations._value_range(img_array.dtype))
         return hist
 
     @staticmethod
-    def calculate_fourier_spectrum(image): #calcula o espectro de Fourier da imagem (magnitude logarítmica)
-        img_array = np.array(image)
-        f = np.fft.fft2(img_array)
-        fshift = np.fft.fftshift(f)
+    def _batch_histogram(img_array): #(N, 256): um bincount só, com deslocamento de 256 * n para a imagem n
+        n = img_array.shape[0]
+        if img_array.dtype in (np.uint8, np.uint16):
+            bins = img_array.reshape(n, -1) >> (8 if img_array.dtype == np.uint16 else 0)
+            valid = None
+        else:
+            low, high = ImageOperations._value_range(img_array.dtype)
+            #limites no dtype da imagem, como np.histogram faz com range=(0.0, 1.0)
+            limits = [np.full(n, limit, img_array.dtype) for limit in (low, high)]
+            bins, valid, _ = ImageOperations._uniform_bin_indices(img_array.reshape(n, -1), *limits, 256)
+        return ImageOperations._offset_bincount(bins, 256, valid)
+
+    @staticmethod
+    def _offset_bincount(bins, nbins, valid=None): #contagens por linha de `bins` (N, M) -> (N, nbins) em um único bincount
+        n = bins.shape[0]
+        offset_bins = bins + (np.arange(n) * nbins)[:, np.newaxis]
+        if valid is not None:
+            offset_bins = offset_bins[valid]
+        return np.bincount(offset_bins.ravel(), minlength=n * nbins).reshape(n, nbins)
+
+    @staticmethod
+    def _uniform_bin_indices(values, low, high, nbins): #mesmos índices de np.histogram(range=(low, high)), com faixa por linha
+        #linhas (N, M) e limites (N,); reproduz o cálculo do NumPy, inclusive as correções nas bordas dos bins
+        bin_type = np.result_type(low, high, values)
+        if not np.issubdtype(bin_type, np.inexact):
+            bin_type = np.result_type(bin_type, float)
+        low = np.asarray(low, bin_type)[:, np.newaxis]
+        high = np.asarray(high, bin_type)[:, np.newaxis]
+        edges = np.linspace(low, high, nbins + 1, axis=1, dtype=bin_type)[:, :, 0]
+        rows = np.arange(values.shape[0])[:, np.newaxis]
+        
+        valid = (values >= low) & (values <= high)
+        indices = ((values - low) / (high - low) * nbins).astype(np.intp)
+        indices[indices == nbins] -= 1
+        np.clip(indices, 0, nbins - 1, out=indices) #só afeta valores fora da faixa, que são descartados por `valid`
+        indices[values < edges[rows, indices]] -= 1
+        np.clip(indices, 0, nbins - 1, out=indices)
+        increment = (values >= edges[rows, indices + 1]) & (indices != nbins - 1)
+        indices[increment] += 1
+        return indices, valid, edges
+
+    @staticmethod
+    def _batch_image_histograms(img_array): #histogramas como os do skimage (por imagem): contagens (N, K) e centros dos bins
+        n = img_array.shape[0]
+        flat = img_array.reshape(n, -1)
+        if img_array.dtype.kind in 'ui':
+            #inteiros: um bin por valor, entre o mínimo e o máximo da pilha
+            low = int(flat.min())
+            span = int(flat.max()) - low + 1
+            counts = ImageOperations._offset_bincount(flat.astype(np.intp) - low, span)
+            return counts, np.arange(low, low + span)[np.newaxis, :], flat
+        
+        #float: 256 bins entre o mínimo e o máximo de cada imagem (np.histogram com range=None)
+        low, high = flat.min(axis=1), flat.max(axis=1)
+        constant = low == high
+        low = np.where(constant, low - 0.5, low)
+        high = np.where(constant, high + 0.5, high)
+        indices, _, edges = ImageOperations._uniform_bin_indices(flat, low, high, 256)
+        counts = ImageOperations._offset_bincount(indices, 256)
+        return counts, (edges[:, :-1] + edges[:, 1:]) / 2.0, flat
+
+    @staticmethod
+    def _batch_otsu_thresholds(img_array): #threshold_otsu de cada imagem da pilha, a partir de histogramas em lote
+        counts, bin_centers, flat = ImageOperations._batch_image_histograms(img_array)
+        counts = counts.astype(np.float32) #o skimage também faz as contas com contagens em float32
+        
+        #mesmas fórmulas do skimage; bins fora da faixa de cada imagem (peso zero) são ignorados
+        with np.errstate(divide='ignore', invalid='ignore'):
+            weight1 = np.cumsum(counts, axis=1)
+            weight2 = np.cumsum(counts[:, ::-1], axis=1)[:, ::-1]
+            mean1 = np.cumsum(counts * bin_centers, axis=1) / weight1
+            mean2 = (np.cumsum((counts * bin_centers)[:, ::-1], axis=1) / weight2[:, ::-1])[:, ::-1]
+            variance12 = weight1[:, :-1] * weight2[:, 1:] * (mean1[:, :-1] - mean2[:, 1:]) ** 2
+        variance12[~np.isfinite(variance12)] = -np.inf
+        
+        idx = np.argmax(variance12, axis=1)
+        thresholds = np.take_along_axis(np.broadcast_to(bin_centers, counts.shape), idx[:, np.newaxis], axis=1)[:, 0]
+        
+        #imagem constante: o skimage devolve o próprio valor
+        constant = flat.min(axis=1) == flat.max(axis=1)
+        return np.where(constant, flat[:, 0], thresholds)
+
+    @staticmethod
+    def _batch_contrast_stretching(img_array, out_dtype): #rescale_intensity do skimage com percentis de cada imagem
+        axes = ImageOperations._image_axes(img_array)
+        #limites na mesma precisão que o skimage usa (escalares Python: float32 continua float32)
+        calc_dtype = img_array.dtype if img_array.dtype.kind == 'f' else np.float64
+        p2, p98 = np.percentile(img_array, (2, 98), axis=axes, keepdims=True)
+        span = (p98 - p2).astype(calc_dtype)
+        p2, p98 = p2.astype(calc_dtype), p98.astype(calc_dtype)
+        if out_dtype.kind == 'f':
+            omin, omax = 0.0, 1.0
+        else:
+            omin, omax = float(np.iinfo(out_dtype).min), float(np.iinfo(out_dtype).max)
+        
+        image = np.clip(img_array, p2, p98)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            stretched = (image - p2) / span * (omax - omin) + omin
+        stretched = np.where(span != 0, stretched, np.clip(image, omin, omax))
+        return stretched.astype(out_dtype)
+
+    @staticmethod
+    def _batch_equalize_hist(img_array): #equalize_hist do skimage aplicado a cada imagem da pilha
+        counts, bin_centers, flat = ImageOperations._batch_image_histograms(img_array)
+        output_dtype = np.float32 if img_array.dtype in (np.float16, np.float32) else np.float64
+        cdf = np.cumsum(counts, axis=1)
+        cdf = (cdf / cdf[:, -1:].astype(float)).astype(output_dtype).astype(np.float64)
+        
+        if img_array.dtype.kind in 'ui':
+            #inteiros: cada valor cai exatamente num centro de bin, então a interpolação vira consulta à tabela
+            rows = np.arange(flat.shape[0])[:, np.newaxis]
+            equalized = cdf[rows, flat.astype(np.intp) - bin_centers[0, 0]]
+        else:
+            #float: interpolação linear entre os centros (como np.interp), com bins uniformes por imagem
+            bin_centers = bin_centers.astype(np.float64)
+            flat = flat.astype(np.float64)
+            step = (bin_centers[:, 1] - bin_centers[:, 0])[:, np.newaxis]
+            position = np.clip((flat - bin_centers[:, :1]) / step, 0, 255)
+            left = np.minimum(position.astype(np.intp), 254)
+            rows = np.arange(flat.shape[0])[:, np.newaxis]
+            #os centros em float32 não são exatamente uniformes: corrige o segmento como a busca do np.interp
+            while True:
+                lower = (flat < bin_centers[rows, left]) & (left > 0)
+                upper = (flat >= bin_centers[rows, left + 1]) & (left < 254)
+                if not (lower.any() or upper.any()):
+                    break
+                left -= lower
+                left += upper
+            x0 = bin_centers[rows, left]
+            slope = (cdf[rows, left + 1] - cdf[rows, left]) / (bin_centers[rows, left + 1] - x0)
+            equalized = np.clip(slope * (flat - x0) + cdf[rows, left], cdf[:, :1], 1.0)
+        
+        return equalized.reshape(img_array.shape).astype(output_dtype, copy=False)
+
+    @staticmethod
+    def is_binary_histogram(hist): #verifica pelo histograma se a imagem contém apenas 0 e 255 (pós-Otsu)
+        return hist[0] > 0 and hist[255] > 0 and not np.any(hist[1:255])
+
+    @staticmethod
+    def calculate_fourier_spectrum(image, out_dtype=None, batch=False): #calcula o espectro de Fourier da imagem (magnitude logarítmica)
+        img_array = np.asarray(image)
+        if batch and not ImageOperations._vectorize_batch('fourier_spectrum', img_array):
+            return ImageOperations._stack_results([ImageOperations.calculate_fourier_spectrum(img, out_dtype) for img in img_array])
+        axes = ImageOperations._spatial_axes(img_array, batch)
+        f = np.fft.fft2(img_array, axes=axes)
+        fshift = np.fft.fftshift(f, axes=axes)
         magnitude_spectrum = 20 * np.log(np.abs(fshift) + 1)
-        magnitude_spectrum = ImageOperations._normalize_image(magnitude_spectrum)
-        return Image.fromarray(magnitude_spectrum)
\ No newline at end of file
+        magnitude_spectrum = ImageOperations._normalize_image(magnitude_spectrum, out_dtype=ImageOperations._output_dtype(img_array, out_dtype), batch=batch)
+        return ImageOperations._wrap(magnitude_spectrum, image)
+
+    @staticmethod
+    def fourier_spectrum_from_rfft(rfft, cols, out_dtype=np.uint8): #mesmo espectro de calculate_fourier_spectrum a partir da rfft2 (H, W//2 + 1) de uma imagem 2D
+        #imagem real: |F(u, v)| = |F(-u, -v)|, então as colunas que faltam são a metade guardada espelhada
+        half = np.abs(rfft).astype(np.float64)
+        rows = half.shape[0]
+        magnitude = np.empty((rows, cols), np.float64)
+        magnitude[:, :half.shape[1]] = half
+        mirrored_cols = cols - np.arange(half.shape[1], cols)
+        magnitude[:, half.shape[1]:] = half[(-np.arange(rows)) % rows][:, mirrored_cols]
+        
+        magnitude_spectrum = 20 * np.log(np.fft.fftshift(magnitude) + 1)
+        return ImageOperations._normalize_image(magnitude_spectrum, out_dtype=np.dtype(out_dtype))
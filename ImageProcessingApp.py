@@ -1,12 +1,17 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox
-from PIL import Image, ImageTk, ImageOps
+from PIL import Image, ImageTk
 import os
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from ImageOperations import ImageOperations
+from matplotlib.ticker import AutoLocator
+from ImageOperations import ImageOperations, NUMBA_INSTALLED
 from Descriptors import Descriptors
+from Segmentation import Segmentation
+from ImageLoader import ImageLoader
+from Recipe import Recipe
+from DerivedCache import DerivedCache
 
 
 class ImageProcessingApp:
@@ -14,6 +19,13 @@ class ImageProcessingApp:
         self.root = root
         self.root.title("Sistema de Processamento de Imagens")
         self.current_histogram_fig = None
+        self.histogram_views = {} #janelas de histograma abertas (figura/canvas reaproveitados)
+        self.recipe = Recipe() #operações aplicadas desde o carregamento/reset, para repetir fora da interface
+        self.display_pyramid = [] #níveis reduzidos da imagem original, usados para exibir sem redimensionar a partir do tamanho cheio
+        try:
+            self.cache = DerivedCache() #histograma, espectro, pirâmide e descritores da imagem original, guardados entre execuções
+        except OSError:
+            self.cache = None
         
         #estado da aplicação
         self.state = {
@@ -45,6 +57,9 @@ class ImageProcessingApp:
         self.file_menu.add_command(label="Abrir Imagem", command=self.load_image)
         self.file_menu.add_command(label="Salvar Imagem", command=self.save_image, state='disabled')
         self.file_menu.add_separator()
+        self.file_menu.add_command(label="Salvar Receita", command=self.save_recipe, state='disabled')
+        self.file_menu.add_command(label="Aplicar Receita", command=self.apply_recipe, state='disabled')
+        self.file_menu.add_separator()
         self.file_menu.add_command(label="Sair", command=self.root.quit)
         self.menu_bar.add_cascade(label="Arquivo", menu=self.file_menu)
         
@@ -75,6 +90,11 @@ class ImageProcessingApp:
     def setup_segmentation_menu(self):
         segmentation_menu = tk.Menu(self.process_menu, tearoff=0)
         segmentation_menu.add_command(label="Limiarização de Otsu", command=self.apply_otsu)
+        segmentation_menu.add_command(label="Otsu Multinível (3 classes)", command=self.apply_multi_otsu)
+        segmentation_menu.add_separator()
+        segmentation_menu.add_command(label="Limiarização Adaptativa de Sauvola", command=lambda: self.apply_adaptive_threshold('sauvola'))
+        segmentation_menu.add_command(label="Limiarização Adaptativa de Niblack", command=lambda: self.apply_adaptive_threshold('niblack'))
+        segmentation_menu.add_command(label="Limiarização Adaptativa de Bradley", command=lambda: self.apply_adaptive_threshold('bradley'))
         self.process_menu.add_cascade(label="Segmentação", menu=segmentation_menu)
     
     def setup_morphology_menu(self):
@@ -128,6 +148,10 @@ class ImageProcessingApp:
         descriptors_menu.add_command(label="Descritores de Cor (Intensidade Média)", command=self.calculate_intensity_stats)
         
         self.extra_menu.add_cascade(label="Descritores de Imagem", menu=descriptors_menu)
+        
+        self.numba_backend = tk.BooleanVar(value=ImageOperations.backend == 'numba')
+        self.extra_menu.add_checkbutton(label="Kernels Compilados (numba)", variable=self.numba_backend,
+                                        command=self.toggle_backend, state='normal' if NUMBA_INSTALLED else 'disabled')
         self.menu_bar.add_cascade(label="Extra", menu=self.extra_menu)
     
     def setup_toolbar(self):
@@ -160,13 +184,11 @@ class ImageProcessingApp:
             
         try:
             self.update_status(f"Carregando imagem: {os.path.basename(file_path)}...")
-            image = Image.open(file_path)
-            
-            if image.mode != 'L':
-                image = ImageOps.grayscale(image)
-                self.state['is_gray'] = True
-            else:
-                self.state['is_gray'] = True
+            #a interface trabalha em cinza, 8 bits (JPEG já é decodificado direto assim): arquivos de 16 bits ou coloridos
+            #perdem profundidade/cor aqui; para processá-los completos use as operações com ImageLoader.load_native
+            #ou o RecipeReplayer com --loader native
+            image = ImageLoader.load_grayscale(file_path)
+            self.state['is_gray'] = True
             
             self.state.update({
                 'original_image': image.copy(),
@@ -174,6 +196,8 @@ class ImageProcessingApp:
                 'current_image': image.copy(),
                 'image_path': file_path
             })
+            self.recipe = Recipe()
+            self.display_pyramid = self.cache.pyramid(file_path, image) if self.cache else []
             
             self.display_image(image)
             self.enable_image_operations()
@@ -185,6 +209,8 @@ class ImageProcessingApp:
     
     def enable_image_operations(self):
         self.file_menu.entryconfig("Salvar Imagem", state='normal')
+        self.file_menu.entryconfig("Salvar Receita", state='normal')
+        self.file_menu.entryconfig("Aplicar Receita", state='normal')
         self.process_menu.entryconfig("Histograma", state='normal')
         self.reset_button.config(state='normal')
         self.extra_menu.entryconfig(0, state='normal')
@@ -232,7 +258,14 @@ class ImageProcessingApp:
         ratio = min(ratio, 1.0)
         
         new_size = (int(img_width * ratio), int(img_height * ratio))
-        resized_image = image.resize(new_size, Image.LANCZOS)
+        
+        #imagem original: parte do menor nível da pirâmide que ainda é maior que o tamanho exibido
+        source = image
+        if self.state['processed_image'] is None:
+            for level in self.display_pyramid:
+                if level.shape[1] >= new_size[0] and level.shape[0] >= new_size[1]:
+                    source = Image.fromarray(np.asarray(level))
+        resized_image = source.resize(new_size, Image.LANCZOS)
         
         self.tk_image = ImageTk.PhotoImage(resized_image)
         self.image_label.config(image=self.tk_image)
@@ -243,9 +276,21 @@ class ImageProcessingApp:
         if self.state['original_image']:
             self.state['current_image'] = self.state['original_image'].copy()
             self.state['processed_image'] = None
+            self.recipe.clear()
             self.display_image(self.state['current_image'])
             self.update_status("Imagem resetada para o original")
     
+    def original_cache_path(self): #caminho do arquivo quando a imagem atual é a original (só ela tem dados no cache)
+        if self.cache is None or self.state['processed_image'] is not None:
+            return None
+        return self.state['image_path']
+    
+    def toggle_backend(self):
+        backend = ImageOperations.set_backend('numba' if self.numba_backend.get() else 'numpy')
+        if backend == 'numba':
+            ImageOperations.kernels().warm_up() #compila em segundo plano; até terminar, as operações seguem no caminho NumPy
+        self.update_status(f"Backend das operações: {backend}")
+    
     def update_status(self, message):
         self.status_bar.config(text=message)
         self.root.update_idletasks()
@@ -258,7 +303,7 @@ class ImageProcessingApp:
         try:
             self.update_status("Aplicando limiarização de Otsu...")
             processed_img, threshold = ImageOperations.apply_otsu(self.state['current_image'])
-            self.update_image_state(processed_img)
+            self.update_image_state(processed_img, 'apply_otsu')
             
             self.update_status(f"Limiarização de Otsu aplicada (Threshold: {threshold:.2f})")
             self.show_histogram(threshold=threshold)
@@ -267,7 +312,38 @@ class ImageProcessingApp:
             messagebox.showerror("Erro", f"Falha ao aplicar Otsu:\n{str(e)}")
             self.update_status("Erro ao aplicar limiarização")
     
-    def update_image_state(self, processed_img):
+    def apply_multi_otsu(self):
+        if not self.state['current_image']:
+            messagebox.showwarning("Aviso", "Nenhuma imagem carregada")
+            return
+            
+        try:
+            self.update_status("Aplicando Otsu multinível...")
+            processed_img, thresholds = Segmentation.apply_multi_otsu(self.state['current_image'], classes=3)
+            self.update_image_state(processed_img, 'apply_multi_otsu', {'classes': 3})
+            self.update_status(f"Otsu multinível aplicado (Thresholds: {', '.join(str(t) for t in thresholds)})")
+            
+        except Exception as e:
+            messagebox.showerror("Erro", f"Falha ao aplicar Otsu multinível:\n{str(e)}")
+            self.update_status("Erro ao aplicar limiarização")
+    
+    def apply_adaptive_threshold(self, method):
+        if not self.state['current_image']:
+            messagebox.showwarning("Aviso", "Nenhuma imagem carregada")
+            return
+            
+        try:
+            self.update_status(f"Aplicando limiarização adaptativa ({method})...")
+            processed_img = Recipe.adaptive_threshold(self.state['current_image'], method)
+            self.update_image_state(processed_img, 'apply_adaptive_threshold', {'method': method})
+            self.update_status(f"Limiarização adaptativa ({method}) aplicada")
+            
+        except Exception as e:
+            messagebox.showerror("Erro", f"Falha ao aplicar limiarização adaptativa:\n{str(e)}")
+            self.update_status("Erro ao aplicar limiarização")
+    
+    def update_image_state(self, processed_img, operation, params=None): #mostra o resultado e grava o passo na receita
+        self.recipe.record(operation, params)
         self.state['processed_image'] = processed_img
         self.state['current_image'] = processed_img
         self.display_image(processed_img)
@@ -280,7 +356,7 @@ class ImageProcessingApp:
         try:
             self.update_status("Aplicando alargamento de contraste...")
             processed_img = ImageOperations.contrast_stretching(self.state['current_image'])
-            self.update_image_state(processed_img)
+            self.update_image_state(processed_img, 'contrast_stretching')
             self.update_status("Alargamento de contraste aplicado")
             
         except Exception as e:
@@ -295,13 +371,64 @@ class ImageProcessingApp:
         try:
             self.update_status("Aplicando equalização de histograma...")
             processed_img = ImageOperations.histogram_equalization(self.state['current_image'])
-            self.update_image_state(processed_img)
+            self.update_image_state(processed_img, 'histogram_equalization')
             self.update_status("Equalização de histograma aplicada")
             
         except Exception as e:
             messagebox.showerror("Erro", f"Falha ao aplicar equalização de histograma:\n{str(e)}")
             self.update_status("Erro ao processar imagem")
     
+    def save_recipe(self):
+        if not self.recipe.steps:
+            messagebox.showwarning("Aviso", "Nenhuma operação aplicada para salvar na receita")
+            return
+            
+        file_path = filedialog.asksaveasfilename(
+            title="Salvar receita",
+            defaultextension=".json",
+            filetypes=[("Receita JSON", "*.json"), ("Todos os arquivos", "*.*")]
+        )
+        
+        if not file_path:
+            return
+            
+        try:
+            #a imagem mostrada agora vira a referência que o RecipeReplayer precisa reproduzir bit a bit
+            self.recipe.set_reference(self.state['image_path'], self.state['current_image'])
+            self.recipe.save(file_path)
+            self.update_status(f"Receita salva ({len(self.recipe.steps)} passos): {os.path.basename(file_path)}")
+            
+        except Exception as e:
+            messagebox.showerror("Erro", f"Não foi possível salvar a receita:\n{str(e)}")
+            self.update_status("Erro ao salvar receita")
+    
+    def apply_recipe(self):
+        if not self.state['current_image']:
+            messagebox.showwarning("Aviso", "Nenhuma imagem carregada")
+            return
+            
+        file_path = filedialog.askopenfilename(
+            title="Selecione uma receita",
+            filetypes=[("Receita JSON", "*.json"), ("Todos os arquivos", "*.*")]
+        )
+        
+        if not file_path:
+            return
+            
+        try:
+            self.update_status(f"Aplicando receita: {os.path.basename(file_path)}...")
+            recipe = Recipe.load(file_path)
+            processed_img = recipe.apply(self.state['current_image'])
+            self.recipe.steps.extend(recipe.steps)
+            self.state['processed_image'] = processed_img
+            self.state['current_image'] = processed_img
+            self.display_image(processed_img)
+            self.update_status(f"Receita aplicada ({len(recipe.steps)} passos)")
+            
+        except Exception as e:
+            messagebox.showerror("Erro", f"Falha ao aplicar receita:\n{str(e)}")
+            self.update_status("Erro ao aplicar receita")
+    
     def apply_filter(self, filter_type):
         if not self.state['current_image']:
             messagebox.showwarning("Aviso", "Nenhuma imagem carregada")
@@ -310,7 +437,7 @@ class ImageProcessingApp:
         try:
             self.update_status(f"Aplicando filtro {filter_type}...")
             processed_img = ImageOperations.apply_filter(self.state['current_image'], filter_type)
-            self.update_image_state(processed_img)
+            self.update_image_state(processed_img, 'apply_filter', {'filter_type': filter_type})
             self.update_status(f"Filtro {filter_type} aplicado com sucesso")
             
         except Exception as e:
@@ -325,7 +452,7 @@ class ImageProcessingApp:
         try:
             self.update_status(f"Aplicando filtro {filter_type}...")
             processed_img = ImageOperations.frequency_filter(self.state['current_image'], filter_type)
-            self.update_image_state(processed_img)
+            self.update_image_state(processed_img, 'frequency_filter', {'filter_type': filter_type})
             self.update_status(f"Filtro {filter_type} aplicado com sucesso")
             
         except Exception as e:
@@ -340,7 +467,7 @@ class ImageProcessingApp:
         try:
             self.update_status(f"Aplicando {operation}...")
             processed_img = ImageOperations.apply_morphology(self.state['current_image'], operation)
-            self.update_image_state(processed_img)
+            self.update_image_state(processed_img, 'apply_morphology', {'operation': operation})
             self.update_status(f"{operation} aplicada com sucesso")
             
         except Exception as e:
@@ -353,72 +480,139 @@ class ImageProcessingApp:
             return
         
         try:
-            img_array = np.array(self.state['current_image'])
-            
-            #verifica se é imagem binária (pós-Otsu)
-            unique_vals = np.unique(img_array)
-            is_binary = len(unique_vals) <= 2 and (0 in unique_vals and 255 in unique_vals)
-            
-            if is_binary:
-                #histograma especial para imagens binárias
-                hist = np.zeros(256)
-                count_0 = np.sum(img_array == 0)
-                count_255 = np.sum(img_array == 255)
-                hist[0] = count_0
-                hist[255] = count_255
-                
-                #cria figura com ajustes para binário
-                fig = plt.Figure(figsize=(6, 4), dpi=100)
-                ax = fig.add_subplot(111)
-                
-                #plota apenas as barras relevantes
-                ax.bar([0, 255], [count_0, count_255], width=10, color='gray')
-                ax.set_title("Histograma Binário (Pós-Otsu)")
-                ax.set_xlabel("Valores de Pixel")
-                ax.set_ylabel("Frequência")
-                ax.set_xlim(-10, 265)  #espaço para visualização
-                ax.set_xticks([0, 255])  #mostra apenas 0 e 255 no eixo X
-                
-            else:
-                #histograma normal para imagens não-binárias
-                hist = ImageOperations.calculate_histogram(self.state['current_image'])
-                
-                fig = plt.Figure(figsize=(6, 4), dpi=100)
-                ax = fig.add_subplot(111)
-                ax.bar(range(256), hist, width=1, color='gray')
-                ax.set_title("Histograma de Tons de Cinza")
-                ax.set_xlabel("Intensidade")
-                ax.set_ylabel("Frequência")
-                ax.set_xlim(0, 255)
-            
-            #adiciona linha do threshold se fornecido
-            if threshold is not None:
-                ax.axvline(x=threshold, color='r', linestyle='dashed', linewidth=2)
-                ax.text(threshold+5, ax.get_ylim()[1]*0.9, 
-                    f'Threshold: {threshold:.1f}', color='red')
-            
-            #configuração da janela
-            hist_window = tk.Toplevel(self.root)
-            hist_window.title("Histograma")
-            
-            canvas = FigureCanvasTkAgg(fig, master=hist_window)
-            canvas.draw()
-            canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
-            
-            #botão de salvar
-            btn_frame = tk.Frame(hist_window)
-            btn_frame.pack(fill=tk.X, padx=5, pady=5)
-            tk.Button(btn_frame, text="Fechar", command=hist_window.destroy).pack(side=tk.RIGHT)
-            tk.Button(btn_frame, text="Salvar", 
-                    command=lambda: self.save_histogram(fig, hist_window)).pack(side=tk.RIGHT, padx=5)
-            
-            #mantém referências
-            self.current_histogram_fig = fig
-            hist_window._canvas = canvas
+            #uma única passada sobre os pixels; detecção de binário, gráfico e vistas usam o mesmo histograma
+            hist = self.current_histogram()
+            is_binary = ImageOperations.is_binary_histogram(hist)
+            
+            view = self.get_histogram_view('histogram', "Histograma", figsize=(6, 4))
+            view.update({
+                'hist': hist,
+                'is_binary': is_binary, #histograma especial para imagens binárias (pós-Otsu)
+                'title': "Histograma Binário (Pós-Otsu)" if is_binary else "Histograma de Tons de Cinza",
+                'xlabel': "Valores de Pixel" if is_binary else "Intensidade",
+                'threshold': threshold,
+                'stats': None
+            })
+            self.render_histogram_view(view)
+            self.current_histogram_fig = view['fig']
             
         except Exception as e:
             messagebox.showerror("Erro", f"Falha ao exibir histograma:\n{str(e)}")
 
+    def current_histogram(self):
+        cache_path = self.original_cache_path()
+        if cache_path:
+            return self.cache.histogram(cache_path, self.state['current_image'])
+        return ImageOperations.calculate_histogram(self.state['current_image'])
+    
+    def get_histogram_view(self, key, title, figsize):
+        #reaproveita a janela/figura/canvas se ainda estiver aberta
+        view = self.histogram_views.get(key)
+        if view is not None and view['window'].winfo_exists():
+            view['window'].lift()
+            return view
+        
+        window = tk.Toplevel(self.root)
+        window.title(title)
+        
+        fig = plt.Figure(figsize=figsize, dpi=100)
+        ax = fig.add_subplot(111)
+        canvas = FigureCanvasTkAgg(fig, master=window)
+        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        
+        view = {
+            'window': window,
+            'fig': fig,
+            'ax': ax,
+            'canvas': canvas,
+            'bars': None,
+            'layout': None,
+            'overlays': [],
+            'mode': 'linear',
+            'hist': None
+        }
+        
+        #botões de vista (linear, acumulado, log) e de salvar
+        btn_frame = tk.Frame(window)
+        btn_frame.pack(fill=tk.X, padx=5, pady=5)
+        tk.Button(btn_frame, text="Fechar", command=window.destroy).pack(side=tk.RIGHT)
+        tk.Button(btn_frame, text="Salvar", 
+                command=lambda: self.save_histogram(fig, window)).pack(side=tk.RIGHT, padx=5)
+        for label, mode in [("Linear", 'linear'), ("Acumulado", 'cumulative'), ("Log", 'log')]:
+            tk.Button(btn_frame, text=label, 
+                    command=lambda m=mode: self.set_histogram_mode(view, m)).pack(side=tk.LEFT, padx=2)
+        
+        self.histogram_views[key] = view
+        return view
+
+    def set_histogram_mode(self, view, mode):
+        view['mode'] = mode
+        self.render_histogram_view(view)
+
+    def render_histogram_view(self, view):
+        ax = view['ax']
+        hist = view['hist']
+        mode = view['mode']
+        
+        #as vistas derivam do histograma já calculado, sem nova passada sobre os pixels
+        heights = np.cumsum(hist) if mode == 'cumulative' else hist
+        layout = 'binary' if view['is_binary'] else 'gray'
+        if layout == 'binary':
+            heights = heights[[0, 255]]
+        
+        if view['bars'] is None or view['layout'] != layout:
+            if view['bars'] is not None:
+                view['bars'].remove()
+            if layout == 'binary':
+                #plota apenas as barras relevantes
+                view['bars'] = ax.bar([0, 255], heights, width=10, color='gray')
+            else:
+                view['bars'] = ax.bar(range(256), heights, width=1, color='gray')
+            view['layout'] = layout
+        else:
+            #atualiza as alturas das barras existentes em vez de recriar a figura
+            for bar, height in zip(view['bars'], heights):
+                bar.set_height(height)
+        
+        if layout == 'binary':
+            ax.set_xlim(-10, 265)  #espaço para visualização
+            ax.set_xticks([0, 255])  #mostra apenas 0 e 255 no eixo X
+        else:
+            ax.set_xlim(0, 255)
+            ax.xaxis.set_major_locator(AutoLocator())
+        
+        top = max(heights.max(), 1)
+        if mode == 'log':
+            ax.set_yscale('log', nonpositive='clip')
+            ax.set_ylim(0.8, top * 1.5)
+        else:
+            ax.set_yscale('linear')
+            ax.set_ylim(0, top * 1.05)
+        
+        ylabels = {'linear': "Frequência", 'cumulative': "Frequência Acumulada", 'log': "Frequência (log)"}
+        ax.set_title(view['title'])
+        ax.set_xlabel(view['xlabel'])
+        ax.set_ylabel(ylabels[mode])
+        
+        for artist in view['overlays']:
+            artist.remove()
+        view['overlays'] = []
+        
+        #adiciona linha do threshold se fornecido
+        threshold = view.get('threshold')
+        if threshold is not None:
+            view['overlays'].append(ax.axvline(x=threshold, color='r', linestyle='dashed', linewidth=2))
+            view['overlays'].append(ax.text(threshold+5, ax.get_ylim()[1]*0.9, 
+                f'Threshold: {threshold:.1f}', color='red'))
+        
+        stats = view.get('stats')
+        if stats is not None:
+            stats_text = f"Média: {stats['mean']:.2f}\nDesvio Padrão: {stats['std']:.2f}\nMediana: {stats['median']:.2f}"
+            view['overlays'].append(ax.text(0.7, 0.9, stats_text, transform=ax.transAxes, 
+                   bbox=dict(facecolor='white', alpha=0.8)))
+        
+        view['canvas'].draw_idle()
+
     def save_histogram(self, fig, parent_window):
         if fig is None:
             messagebox.showwarning("Aviso", "Nenhum histograma para salvar", parent=parent_window)
@@ -447,7 +641,11 @@ class ImageProcessingApp:
 
         try:
             self.update_status("Calculando espectro de Fourier...")
-            spectrum_img = ImageOperations.calculate_fourier_spectrum(self.state['current_image'])
+            cache_path = self.original_cache_path()
+            if cache_path:
+                spectrum_img = Image.fromarray(self.cache.fourier_spectrum(cache_path, self.state['current_image']))
+            else:
+                spectrum_img = ImageOperations.calculate_fourier_spectrum(self.state['current_image'])
             
             spectrum_window = tk.Toplevel(self.root)
             spectrum_window.title("Espectro de Fourier")
@@ -499,41 +697,37 @@ class ImageProcessingApp:
             return
             
         try:
-            hist = ImageOperations.calculate_histogram(self.state['current_image'])
-            stats = Descriptors.calculate_intensity_stats(self.state['current_image'])
-            
-            fig = plt.Figure(figsize=(8, 5), dpi=100)
-            ax = fig.add_subplot(111)
-            ax.bar(range(256), hist, width=1, color='gray')
-            ax.set_title("Histograma de Intensidade (Tons de Cinza)")
-            ax.set_xlabel("Valor de Intensidade")
-            ax.set_ylabel("Frequência")
-            
-            stats_text = f"Média: {stats['mean']:.2f}\nDesvio Padrão: {stats['std']:.2f}\nMediana: {stats['median']:.2f}"
-            ax.text(0.7, 0.9, stats_text, transform=ax.transAxes, 
-                   bbox=dict(facecolor='white', alpha=0.8))
-            
-            stats_window = tk.Toplevel(self.root)
-            stats_window.title("Histograma e Estatísticas de Intensidade")
-            
-            canvas = FigureCanvasTkAgg(fig, master=stats_window)
-            canvas.draw()
-            canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
-            
-            save_button = tk.Button(stats_window, text="Salvar Gráfico", 
-                                  command=lambda: self.save_histogram(fig, stats_window))
-            save_button.pack(pady=5)
+            #as estatísticas saem do mesmo histograma usado no gráfico
+            hist = self.current_histogram()
+            stats = Descriptors.calculate_intensity_stats_from_histogram(hist)
+            
+            view = self.get_histogram_view('intensity', "Histograma e Estatísticas de Intensidade", figsize=(8, 5))
+            view.update({
+                'hist': hist,
+                'is_binary': False,
+                'title': "Histograma de Intensidade (Tons de Cinza)",
+                'xlabel': "Valor de Intensidade",
+                'threshold': None,
+                'stats': stats
+            })
+            self.render_histogram_view(view)
             
         except Exception as e:
             messagebox.showerror("Erro", f"Falha ao calcular histograma:\n{str(e)}")
     
+    def current_descriptors(self, name, calculate):
+        cache_path = self.original_cache_path()
+        if cache_path:
+            return self.cache.descriptors(cache_path, name, lambda: calculate(self.state['current_image']))
+        return calculate(self.state['current_image'])
+    
     def calculate_haralick(self):
         if not self.state['current_image']:
             messagebox.showwarning("Aviso", "Nenhuma imagem carregada")
             return
             
         try:
-            features = Descriptors.calculate_haralick_features(self.state['current_image'])
+            features = self.current_descriptors('haralick', Descriptors.calculate_haralick_features)
             
             result_window = tk.Toplevel(self.root)
             result_window.title("Descritores de Textura - Haralick")
@@ -569,7 +763,7 @@ class ImageProcessingApp:
             return
             
         try:
-            moments = Descriptors.calculate_shape_moments(self.state['current_image'])
+            moments = self.current_descriptors('shape_moments', Descriptors.calculate_shape_moments)
             
             result_window = tk.Toplevel(self.root)
             result_window.title("Descritores de Forma - Momentos")
@@ -639,7 +833,7 @@ class ImageProcessingApp:
             return
             
         try:
-            stats = Descriptors.calculate_intensity_stats(self.state['current_image'])
+            stats = self.current_descriptors('intensity_stats', Descriptors.calculate_intensity_stats)
             
             result_window = tk.Toplevel(self.root)
             result_window.title("Estatísticas de Intensidade (Cor)")
@@ -0,0 +1,284 @@
+import threading
+import numpy as np
+
+try:
+    import numba
+    from numba import njit, prange
+    AVAILABLE = True
+except ImportError: #numba é opcional: sem ele as operações seguem nas implementações scipy/skimage/NumPy
+    numba = None
+    prange = range
+    AVAILABLE = False
+
+
+def _compiled(function): #compila em paralelo e guarda o código gerado em disco (cache=True) quando numba está instalado
+    if not AVAILABLE:
+        return function
+    return njit(parallel=True, cache=True, nogil=True)(function)
+
+
+def _inline(function): #funções auxiliares chamadas de dentro dos kernels
+    if not AVAILABLE:
+        return function
+    return njit(cache=True, nogil=True, inline='always')(function)
+
+
+@_inline
+def _reflect(index, length): #borda 'reflect' do scipy.ndimage (d c b a | a b c d | d c b a), inclusive além de uma volta
+    period = 2 * length
+    index %= period
+    if index >= length:
+        index = period - 1 - index
+    return index
+
+
+@_compiled
+def _van_herk_rows(src, size, take_max, out): #máximo/mínimo 1D de cada linha em O(1) por pixel (van Herk/Gil-Werman)
+    rows, n = src.shape
+    half = size // 2
+    length = n + 2 * half
+    for r in prange(rows):
+        padded = np.empty(length, src.dtype)
+        forward = np.empty(length, src.dtype)
+        backward = np.empty(length, src.dtype)
+        for i in range(length):
+            padded[i] = src[r, _reflect(i - half, n)]
+
+        #extremos acumulados dentro de blocos de `size`: para frente a partir do início de cada bloco, para trás a partir do fim
+        for i in range(length):
+            if i % size == 0:
+                forward[i] = padded[i]
+            elif take_max:
+                forward[i] = max(forward[i - 1], padded[i])
+            else:
+                forward[i] = min(forward[i - 1], padded[i])
+        for i in range(length - 1, -1, -1):
+            if i == length - 1 or (i + 1) % size == 0:
+                backward[i] = padded[i]
+            elif take_max:
+                backward[i] = max(backward[i + 1], padded[i])
+            else:
+                backward[i] = min(backward[i + 1], padded[i])
+
+        #toda janela [x, x + size - 1] cruza no máximo uma fronteira de bloco
+        for x in range(n):
+            if take_max:
+                out[r, x] = max(backward[x], forward[x + size - 1])
+            else:
+                out[r, x] = min(backward[x], forward[x + size - 1])
+
+
+@_compiled
+def _median_sorted(src, size, out): #mediana por janela (cópia + ordenação por inserção), para janelas pequenas e qualquer dtype
+    images, rows, cols = src.shape
+    half = size // 2
+    count = size * size
+    for index in prange(images * rows):
+        k = index // rows
+        y = index % rows
+        window = np.empty(count, src.dtype)
+        for x in range(cols):
+            m = 0
+            for dy in range(-half, half + 1):
+                yy = _reflect(y + dy, rows)
+                for dx in range(-half, half + 1):
+                    window[m] = src[k, yy, _reflect(x + dx, cols)]
+                    m += 1
+            for i in range(1, count):
+                value = window[i]
+                j = i - 1
+                while j >= 0 and window[j] > value:
+                    window[j + 1] = window[j]
+                    j -= 1
+                window[j + 1] = value
+            out[k, y, x] = window[count // 2]
+
+
+@_compiled
+def _median_histogram_u8(src, size, out): #mediana de Huang para uint8: histograma da janela atualizado coluna a coluna
+    images, rows, cols = src.shape
+    half = size // 2
+    rank = (size * size) // 2
+    for index in prange(images * rows):
+        k = index // rows
+        y = index % rows
+        hist = np.zeros(256, np.int64)
+        for dy in range(-half, half + 1):
+            yy = _reflect(y + dy, rows)
+            for dx in range(-half, half + 1):
+                hist[src[k, yy, _reflect(dx, cols)]] += 1
+
+        for x in range(cols):
+            if x > 0:
+                leaving = _reflect(x - 1 - half, cols)
+                entering = _reflect(x + half, cols)
+                for dy in range(-half, half + 1):
+                    yy = _reflect(y + dy, rows)
+                    hist[src[k, yy, leaving]] -= 1
+                    hist[src[k, yy, entering]] += 1
+            total = 0
+            for level in range(256):
+                total += hist[level]
+                if total > rank:
+                    out[k, y, x] = level
+                    break
+
+
+@_compiled
+def _glcm_counts(quantized, levels, chunks): #contagem dos pares (pixel, vizinho da direita) em (H, W, C), com histogramas por bloco de linhas
+    rows, cols, channels = quantized.shape
+    partial = np.zeros((chunks, levels * levels), np.int64)
+    for chunk in prange(chunks):
+        for y in range(chunk * rows // chunks, (chunk + 1) * rows // chunks):
+            for x in range(cols - 1):
+                for c in range(channels):
+                    partial[chunk, np.int64(quantized[y, x, c]) * levels + quantized[y, x + 1, c]] += 1
+    counts = np.zeros(levels * levels, np.int64)
+    for chunk in range(chunks):
+        counts += partial[chunk]
+    return counts
+
+
+@_inline
+def _class_cost(P, S, i, j): #S_ij^2 / P_ij da classe (i, j], como em Segmentation.multi_otsu_thresholds
+    if i >= j:
+        return -np.inf
+    weight = P[j] - P[i]
+    if weight > 0:
+        moment = S[j] - S[i]
+        return moment * moment / weight
+    return 0.0
+
+
+@_compiled
+def _multi_otsu_choices(P, S, classes): #mesma programação dinâmica da versão NumPy, sem montar a matriz de custos
+    size = P.size
+    best = np.empty(size)
+    for j in range(size):
+        best[j] = _class_cost(P, S, 0, j)
+    choices = np.zeros((classes - 1, size), np.int64)
+    for c in range(classes - 1):
+        new_best = np.empty(size)
+        for j in prange(size):
+            top = -np.inf
+            arg = 0
+            for i in range(size):
+                value = best[i] + _class_cost(P, S, i, j)
+                if value > top: #primeiro máximo, como np.argmax
+                    top = value
+                    arg = i
+            new_best[j] = top
+            choices[c, j] = arg
+        best = new_best
+    return choices
+
+
+class NumbaKernels:
+    #kernels compilados para laços de pixel sem forma vetorizada eficiente no NumPy; usados por ImageOperations,
+    #Segmentation, Descriptors e FilterBank (via ImageOperations.kernels(), que importa este módulo só quando o backend
+    #numba é pedido) quando ImageOperations.backend == 'numba'. cada função devolve None quando não
+    #se aplica (numba ausente, dtype não suportado, kernels ainda compilando) e o chamador segue no caminho NumPy
+    RANK_DTYPES = (np.uint8, np.uint16, np.int16, np.int32, np.float32, np.float64)
+    _warm_up_thread = None
+
+    @staticmethod
+    def available(): #numba instalado e importado sem erro
+        return AVAILABLE
+
+    @staticmethod
+    def is_ready(): #False só enquanto o aquecimento em segundo plano está compilando
+        thread = NumbaKernels._warm_up_thread
+        return AVAILABLE and (thread is None or not thread.is_alive())
+
+    @staticmethod
+    def warm_up(background=True): #compila os kernels com os dtypes da interface para a primeira chamada não pagar a compilação
+        if not AVAILABLE or NumbaKernels._warm_up_thread is not None:
+            return
+        NumbaKernels.start_threads()
+        thread = threading.Thread(target=NumbaKernels._compile_all, daemon=True)
+        NumbaKernels._warm_up_thread = thread
+        thread.start()
+        if not background:
+            thread.join()
+
+    @staticmethod
+    def start_threads(): #inicia o pool de threads do numba na thread atual; chamar da thread principal
+        #se o pool nascer numa thread secundária (aquecimento, workers do RecipeReplayer), o interpretador trava ao sair
+        if AVAILABLE:
+            numba.get_num_threads()
+
+    @staticmethod
+    def _compile_all(): #só compila a partir dos tipos dos exemplos, sem executar os kernels
+        for dtype in (np.uint8, np.float32):
+            image = np.zeros((1, 8, 8), dtype)
+            NumbaKernels._compile(_median_sorted, image, 3, image)
+            NumbaKernels._compile(_van_herk_rows, image[0], 3, True, image[0])
+        image = np.zeros((1, 8, 8), np.uint8)
+        NumbaKernels._compile(_median_histogram_u8, image, 5, image)
+        NumbaKernels._compile(_glcm_counts, np.zeros((8, 8, 1), np.uint16), 4, 1)
+        NumbaKernels._compile(_multi_otsu_choices, np.zeros(9), np.zeros(9), 3)
+
+    @staticmethod
+    def _compile(kernel, *examples):
+        kernel.compile(tuple(numba.typeof(example) for example in examples))
+
+    @staticmethod
+    def _chunks(rows):
+        return max(1, min(rows, numba.get_num_threads() * 4))
+
+    @staticmethod
+    def rank_filter(img_array, size, axes, filter_type, output=None, pool=None): #mediana/máximo/mínimo size x size nos eixos espaciais, borda 'reflect'
+        #pool: BufferPool para a pilha e os intermediários (ImageOperations passa o da thread); sem pool, aloca a cada chamada
+        if not NumbaKernels.is_ready() or img_array.dtype not in NumbaKernels.RANK_DTYPES:
+            return None
+        buffer = (lambda shape, name: pool.get(shape, img_array.dtype, name)) if pool is not None else \
+                 (lambda shape, name: np.empty(shape, img_array.dtype))
+        #eixos espaciais por último e os demais (pilha, canais) achatados num eixo só de imagens independentes
+        moved = np.moveaxis(img_array, axes, (-2, -1))
+        shape = (int(np.prod(moved.shape[:-2])),) + moved.shape[-2:]
+        if moved.flags.c_contiguous:
+            stack = moved.reshape(shape)
+        else:
+            stack = buffer(shape, 'rank_stack')
+            np.copyto(stack.reshape(moved.shape), moved)
+        last_axes = tuple(axis % img_array.ndim for axis in axes) == (img_array.ndim - 2, img_array.ndim - 1)
+        if output is not None and last_axes and output.flags.c_contiguous:
+            result = output.reshape(shape) #mesma disposição da pilha: o kernel escreve direto na saída
+        else:
+            result = buffer(shape, 'rank_result')
+
+        if filter_type == 'median':
+            if stack.dtype == np.uint8 and size >= 5:
+                _median_histogram_u8(stack, size, result)
+            else:
+                _median_sorted(stack, size, result)
+        else:
+            #separável: linhas e depois colunas (as colunas viram linhas com a transposição)
+            images, rows, cols = shape
+            take_max = filter_type == 'max'
+            _van_herk_rows(stack.reshape(-1, cols), size, take_max, result.reshape(-1, cols))
+            columns = buffer((images, cols, rows), 'rank_columns')
+            np.copyto(columns, result.transpose(0, 2, 1))
+            transposed = buffer((images, cols, rows), 'rank_transposed')
+            _van_herk_rows(columns.reshape(-1, rows), size, take_max, transposed.reshape(-1, rows))
+            result = transposed.transpose(0, 2, 1)
+
+        result = np.moveaxis(result.reshape(moved.shape), (-2, -1), axes)
+        if output is None:
+            return np.array(result) #cópia própria: result pode ser um buffer do pool
+        if not np.may_share_memory(output, result):
+            np.copyto(output, result)
+        return output
+
+    @staticmethod
+    def glcm_counts(quantized, levels): #contagens (levels * levels,) dos pares horizontais de uma imagem (H, W) ou (H, W, C)
+        if not NumbaKernels.is_ready():
+            return None
+        quantized = np.ascontiguousarray(quantized.reshape(quantized.shape[:2] + (-1,)))
+        return _glcm_counts(quantized, levels, NumbaKernels._chunks(quantized.shape[0]))
+
+    @staticmethod
+    def multi_otsu_choices(P, S, classes):
+        if not NumbaKernels.is_ready():
+            return None
+        return list(_multi_otsu_choices(np.ascontiguousarray(P, np.float64), np.ascontiguousarray(S, np.float64), classes))
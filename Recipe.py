@@ -0,0 +1,99 @@
+import json
+import datetime
+import hashlib
+import numpy as np
+from ImageOperations import ImageOperations
+from Segmentation import Segmentation
+
+
+RECIPE_VERSION = 1
+
+#operações que podem entrar numa receita: nome -> (função(imagem, batch, **parâmetros) -> imagem, aceita batch)
+#são as mesmas chamadas feitas pelos menus do ImageProcessingApp; valores extras (limiares) são descartados
+OPERATIONS = {
+    'apply_otsu': (lambda image, batch: ImageOperations.apply_otsu(image, batch=batch)[0], True),
+    'apply_multi_otsu': (lambda image, batch, classes=3: Segmentation.apply_multi_otsu(image, classes=classes)[0], False),
+    'apply_adaptive_threshold': (lambda image, batch, method: Recipe.adaptive_threshold(image, method), False),
+    'contrast_stretching': (lambda image, batch: ImageOperations.contrast_stretching(image, batch=batch), True),
+    'histogram_equalization': (lambda image, batch: ImageOperations.histogram_equalization(image, batch=batch), True),
+    'apply_filter': (lambda image, batch, filter_type: ImageOperations.apply_filter(image, filter_type, batch=batch), True),
+    'frequency_filter': (lambda image, batch, filter_type: ImageOperations.frequency_filter(image, filter_type, batch=batch), True),
+    'apply_morphology': (lambda image, batch, operation: ImageOperations.apply_morphology(image, operation, batch=batch), True)
+}
+
+
+class Recipe:
+    #sequência de operações (nome + parâmetros) gravada na interface e salva como JSON versionado
+    def __init__(self, steps=None, loader='grayscale', reference=None):
+        self.steps = []
+        for step in steps or []:
+            self.record(step['operation'], step.get('params'))
+        self.loader = loader #como a imagem de entrada é lida (o app carrega em tons de cinza)
+        self.reference = reference #resultado da interface para a imagem de origem: caminho e hash dos pixels
+
+    def record(self, operation, params=None): #params: argumentos nomeados da operação (ex.: {'filter_type': 'sobel'})
+        if operation not in OPERATIONS:
+            raise ValueError(f"Operação desconhecida na receita: {operation}")
+        self.steps.append({'operation': operation, 'params': dict(params or {})})
+
+    def clear(self):
+        self.steps = []
+        self.reference = None
+
+    def set_reference(self, source_path, image): #guarda a impressão digital do resultado mostrado na interface
+        self.reference = {'source': source_path, 'digest': Recipe.digest(image)}
+
+    def apply(self, image, batch=False): #executa os passos em ordem; com batch=True, image é uma pilha (N, H, W)
+        for step in self.steps:
+            function, supports_batch = OPERATIONS[step['operation']]
+            if batch and not supports_batch:
+                image = np.stack([function(img, False, **step['params']) for img in image])
+            else:
+                image = function(image, batch, **step['params'])
+        return image
+
+    def to_dict(self):
+        return {
+            'version': RECIPE_VERSION,
+            'created': datetime.datetime.now().isoformat(timespec='seconds'),
+            'loader': self.loader,
+            'steps': self.steps,
+            'reference': self.reference
+        }
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(self.to_dict(), file, indent=2, ensure_ascii=False)
+
+    @staticmethod
+    def from_dict(data):
+        version = data.get('version')
+        if version is None or version > RECIPE_VERSION:
+            raise ValueError(f"Versão de receita não suportada: {version}")
+        recipe = Recipe(loader=data.get('loader', 'grayscale'), reference=data.get('reference'))
+        for step in data['steps']:
+            recipe.record(step['operation'], step.get('params'))
+        return recipe
+
+    @staticmethod
+    def load(path):
+        with open(path, encoding='utf-8') as file:
+            return Recipe.from_dict(json.load(file))
+
+    @staticmethod
+    def adaptive_threshold(image, method):
+        methods = {
+            'sauvola': Segmentation.apply_sauvola,
+            'niblack': Segmentation.apply_niblack,
+            'bradley': Segmentation.apply_bradley
+        }
+        if method not in methods:
+            raise ValueError("Método de limiarização adaptativa desconhecido")
+        return methods[method](image)
+
+    @staticmethod
+    def digest(image): #hash dos pixels (com shape e dtype), igual para PIL e ndarray com o mesmo conteúdo
+        img_array = np.ascontiguousarray(np.asarray(image))
+        content = hashlib.sha256(f"{img_array.shape}{img_array.dtype.str}".encode())
+        content.update(img_array.tobytes())
+        return content.hexdigest()
@@ -0,0 +1,114 @@
+import os
+import sys
+import argparse
+import numpy as np
+from PIL import Image
+from ImageLoader import ImageLoader
+from Recipe import Recipe
+
+
+class RecipeReplayer:
+    #executa uma receita gravada na interface sobre vários arquivos, sem Tkinter, com os caminhos otimizados
+    #(ndarray, leitura antecipada e, opcionalmente, pilhas em lote); verify confere que o resultado é idêntico ao da interface
+    def __init__(self, recipe, batch_size=1, workers=4):
+        self.recipe = recipe
+        #imagens do mesmo tamanho processadas juntas com batch=True; opcional (padrão 1 = imagem a imagem), só compensa
+        #com muitas imagens pequenas (ver ImageOperations.BATCH_MAX_PIXELS)
+        self.batch_size = batch_size
+        self.loader = ImageLoader(workers=workers, loader=RecipeReplayer.loader_for(recipe))
+
+    def run(self, paths): #gera (caminho, resultado ndarray) na ordem de paths
+        stack_paths, stack = [], []
+        for path, img_array in self.loader.iter_images(paths):
+            if stack and (img_array.shape != stack[0].shape or len(stack) >= self.batch_size):
+                yield from self._flush(stack_paths, stack)
+                stack_paths, stack = [], []
+            stack_paths.append(path)
+            stack.append(img_array)
+        if stack:
+            yield from self._flush(stack_paths, stack)
+
+    def run_to_directory(self, paths, output_dir): #salva cada resultado em output_dir como PNG
+        os.makedirs(output_dir, exist_ok=True)
+        written = []
+        for path, result in self.run(paths):
+            name = os.path.splitext(os.path.basename(path))[0] + '.png'
+            output_path = os.path.join(output_dir, name)
+            Image.fromarray(result).save(output_path)
+            written.append(output_path)
+        return written
+
+    def verify(self): #confere o replay contra o hash do resultado que a interface mostrou ao salvar a receita
+        reference = self.recipe.reference
+        if not reference:
+            raise ValueError("A receita não tem resultado de referência da interface")
+        if not os.path.exists(reference['source']):
+            raise ValueError(f"Imagem de origem da referência não encontrada: {reference['source']}")
+        (_, result), = self.run([reference['source']])
+        return Recipe.digest(result) == reference['digest']
+
+    def verify_batching(self, paths): #lote x imagem a imagem (PIL, uma operação por vez) com as mesmas funções de Recipe.OPERATIONS:
+        #só detecta diferenças introduzidas pelo lote/ndarray, não um replay errado (para isso, verify)
+        mismatches = []
+        load = RecipeReplayer.loader_for(self.recipe, pil=True)
+        for path, result in self.run(paths):
+            expected = np.asarray(self.recipe.apply(load(path)))
+            if expected.shape != result.shape or expected.dtype != result.dtype or not np.array_equal(expected, result):
+                mismatches.append(path)
+        return mismatches
+
+    def _flush(self, paths, stack):
+        if len(stack) == 1:
+            results = [self.recipe.apply(stack[0])]
+        else:
+            results = self.recipe.apply(np.stack(stack), batch=True)
+        yield from zip(paths, results)
+
+    @staticmethod
+    def loader_for(recipe, pil=False): #'grayscale': mesma leitura da interface (8 bits, cinza); 'native': canais e profundidade do arquivo
+        if recipe.loader == 'native':
+            return ImageLoader.load_native #as operações aceitam ndarray direto, com ou sem pil
+        if recipe.loader != 'grayscale':
+            raise ValueError(f"Leitor de imagem desconhecido na receita: {recipe.loader}")
+        if pil:
+            return ImageLoader.load_grayscale
+        return lambda path: np.asarray(ImageLoader.load_grayscale(path))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Executa uma receita do ImageProcessingApp sobre vários arquivos")
+    parser.add_argument('recipe', help="receita JSON salva pela interface")
+    parser.add_argument('images', nargs='+', help="imagens de entrada")
+    parser.add_argument('--output', help="pasta onde os resultados são salvos")
+    parser.add_argument('--skip-verify', action='store_true',
+                        help="não confere o replay contra o resultado gravado pela interface (obrigatório sem referência)")
+    parser.add_argument('--verify-batching', type=int, default=0, metavar='N',
+                        help="confere as N primeiras imagens em lote contra o processamento imagem a imagem")
+    parser.add_argument('--batch-size', type=int, default=1,
+                        help="imagens do mesmo tamanho processadas juntas (ex.: 32 para muitas imagens pequenas)")
+    parser.add_argument('--loader', choices=['grayscale', 'native'],
+                        help="'native' mantém 16 bits e canais de cor (a interface sempre lê em cinza, 8 bits)")
+    args = parser.parse_args()
+
+    recipe = Recipe.load(args.recipe)
+    if args.loader and args.loader != recipe.loader:
+        recipe.loader = args.loader
+        recipe.reference = None #o resultado da interface foi calculado com o outro leitor
+    replayer = RecipeReplayer(recipe, batch_size=args.batch_size)
+    if not args.skip_verify:
+        try:
+            identical = replayer.verify()
+        except ValueError as error:
+            sys.exit(f"{error} (use --skip-verify para executar sem conferir)")
+        print("referência da interface:", "idêntica" if identical else "DIVERGENTE")
+        if not identical:
+            sys.exit(1)
+    if args.verify_batching:
+        sample = args.images[:args.verify_batching]
+        mismatches = replayer.verify_batching(sample)
+        print(f"lote verificado: {len(sample) - len(mismatches)}/{len(sample)} idênticas")
+        for path in mismatches:
+            print("  divergente:", path)
+    if args.output:
+        written = replayer.run_to_directory(args.images, args.output)
+        print(f"{len(written)} imagens salvas em {args.output}")
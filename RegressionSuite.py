@@ -0,0 +1,508 @@
+import os
+import sys
+import json
+import time
+import timeit
+import hashlib
+import numpy as np
+import cv2
+import scipy.fft
+from scipy.ndimage import (uniform_filter, median_filter, gaussian_filter, maximum_filter, minimum_filter,
+                           laplace, sobel, prewitt)
+from skimage import data, exposure, measure, morphology
+import skimage.feature
+from skimage.filters import threshold_otsu, threshold_sauvola, threshold_niblack
+from ImageOperations import ImageOperations
+from Descriptors import Descriptors
+from Segmentation import Segmentation
+from FilterBank import FilterBank
+
+
+GOLDEN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'regression_golden.json')
+
+FILTER_TYPES = ['mean', 'median', 'gaussian', 'max', 'min', 'laplacian', 'roberts', 'prewitt', 'sobel']
+FREQUENCY_TYPES = ['ideal_low', 'ideal_high', 'gaussian_low', 'gaussian_high']
+MORPHOLOGY_OPS = ['erosion', 'dilation', 'opening', 'closing']
+
+#tolerâncias: 'levels' = diferença máxima em níveis de cinza e 'fraction' = fração máxima de pixels diferentes;
+#'rtol'/'atol' para descritores numéricos
+PIXEL_EXACT = {'levels': 0, 'fraction': 0.0}
+PIXEL_ROUNDING = {'levels': 1, 'fraction': 0.01} #float32 x float64 na normalização: no máximo 1 nível em poucos pixels
+MEAN_ROUNDING = {'levels': 1, 'fraction': 0.2} #média 3x3 em float32: somas/9 exatas caem de um lado ou do outro do truncamento
+THRESHOLD_EDGE = {'levels': 255, 'fraction': 0.001} #limiares locais: só pixels exatamente na fronteira podem trocar
+VALUES = {'rtol': 1e-9, 'atol': 1e-12}
+
+#orçamentos de tempo (caminho otimizado / referência, na camera 512x512, medida por time_ratio): pior razão em 6
+#execuções de cada backend (numpy e numba) + 25% de margem para ruído; o histograma (~1 ms por chamada) tem folga maior. operações sem caminho rápido próprio (mesma biblioteca da
+#referência por baixo, razão ~1.0x: mediana/máximo/mínimo 3x3, morfologia, Otsu, realce, espectro, multi-Otsu,
+#estatísticas, momentos de forma, limiares locais) ficam sem orçamento
+TIME_BUDGETS = {
+    'apply_filter[mean]': 0.90,
+    'apply_filter[gaussian]': 1.0,
+    'apply_filter[laplacian]': 0.85,
+    'apply_filter[roberts]': 0.90,
+    'apply_filter[prewitt]': 0.70,
+    'apply_filter[sobel]': 0.70,
+    'frequency_filter[ideal_low]': 1.05,
+    'frequency_filter[ideal_high]': 1.05,
+    'frequency_filter[gaussian_low]': 1.0,
+    'frequency_filter[gaussian_high]': 1.0,
+    'fourier_spectrum_from_rfft': 1.0,
+    'calculate_histogram': 0.35,
+    'calculate_intensity_stats_from_histogram': 0.10,
+    'calculate_haralick_features': 0.65,
+    'filter_bank': 0.95
+}
+
+
+class RegressionSuite:
+    #confere os caminhos otimizados contra implementações de referência diretas (sem pool, sem passadas compartilhadas,
+    #sem lote), contra saídas de referência gravadas (regression_golden.json) e contra orçamentos de tempo.
+    #uso: python RegressionSuite.py [--update-golden] [--skip-timing]
+
+    @staticmethod
+    def make_images(): #imagens sintéticas (determinísticas) e de exemplo do skimage
+        rng = np.random.default_rng(392)
+        y, x = np.mgrid[:192, :256]
+        ramp = (x + y) / (x.max() + y.max()) * 160
+        disk = 60 * (((x - 128)**2 + (y - 96)**2) < 50**2)
+        synthetic = np.clip(ramp + disk + rng.normal(0, 8, x.shape), 0, 255).astype(np.uint8)
+        checker = (((x // 16 + y // 16) % 2) * 200 + 30).astype(np.uint8)
+        return {
+            'synthetic': synthetic,
+            'checker': checker,
+            'camera': data.camera(),
+            'coins': data.coins()
+        }
+
+    @staticmethod
+    def make_stacks(images): #pilhas para conferir batch=True contra o laço imagem a imagem, em vários dtypes
+        camera = images['camera']
+        tiles = np.stack([camera[r:r + 96, c:c + 128] for r in (0, 200, 400) for c in (0, 300)])
+        #recortes pequenos: abaixo de todos os limites de BATCH_MAX_PIXELS, passam pelos caminhos vetorizados
+        small = np.stack([camera[r:r + 32, c:c + 32] for r in (0, 200, 400) for c in (0, 300)])
+        return {
+            'uint8_small': small,
+            'float32_small': small.astype(np.float32) / 255,
+            'uint8': tiles,
+            'uint16': tiles.astype(np.uint16) * 257,
+            'float32': tiles.astype(np.float32) / 255,
+            'rgb': np.stack([tiles, 255 - tiles, tiles // 2], axis=-1)
+        }
+
+    #----- implementações de referência (diretas, em float64) -----
+
+    @staticmethod
+    def reference_normalize(img_array):
+        img_array = img_array.astype(np.float64) - img_array.min()
+        if img_array.max() > 0:
+            img_array = img_array / img_array.max() * 255
+        return img_array.astype(np.uint8)
+
+    @staticmethod
+    def reference_gradient(img, filter_type): #magnitude do gradiente pelos operadores do scipy (Roberts pela definição)
+        if filter_type == 'roberts':
+            padded = np.pad(img, ((0, 1), (0, 1)), mode='symmetric') #diferenças cruzadas com o vizinho de baixo/direita
+            return np.hypot(padded[1:, 1:] - padded[:-1, :-1], padded[1:, :-1] - padded[:-1, 1:])
+        operator = sobel if filter_type == 'sobel' else prewitt
+        return np.hypot(operator(img, axis=1), operator(img, axis=0))
+
+    @staticmethod
+    def reference_filter(img_array, filter_type):
+        img = img_array.astype(np.float64)
+        lowpass = {
+            'mean': lambda: uniform_filter(img, size=3),
+            'median': lambda: median_filter(img_array, size=3),
+            'gaussian': lambda: gaussian_filter(img, sigma=1),
+            'max': lambda: maximum_filter(img_array, size=3),
+            'min': lambda: minimum_filter(img_array, size=3),
+            'laplacian': lambda: laplace(img)
+        }
+        if filter_type in lowpass:
+            filtered = lowpass[filter_type]()
+        else:
+            filtered = RegressionSuite.reference_gradient(img, filter_type)
+        return RegressionSuite.reference_normalize(filtered)
+
+    @staticmethod
+    def reference_frequency_filter(img_array, filter_type):
+        #máscara pela definição: distância ao centro do espectro; ideal = disco de raio min/4, gaussiana com sigma min/6
+        rows, cols = img_array.shape
+        y, x = np.ogrid[:rows, :cols]
+        distance2 = (y - rows // 2)**2 + (x - cols // 2)**2
+        if 'ideal' in filter_type:
+            mask = (distance2 <= (min(rows, cols) // 4)**2).astype(np.float64)
+        else:
+            mask = np.exp(-distance2 / (2.0 * (min(rows, cols) // 6)**2))
+        if 'high' in filter_type:
+            mask = 1 - mask
+        shifted = np.fft.fftshift(np.fft.fft2(img_array.astype(np.float64))) * mask
+        return RegressionSuite.reference_normalize(np.abs(np.fft.ifft2(np.fft.ifftshift(shifted))))
+
+    @staticmethod
+    def reference_morphology(img_array, operation):
+        binary = img_array > threshold_otsu(img_array)
+        footprint = np.ones((3, 3), bool)
+        result = getattr(morphology, operation)(binary, footprint)
+        return (result * 255).astype(np.uint8)
+
+    @staticmethod
+    def reference_spectrum(img_array):
+        magnitude = 20 * np.log(np.abs(np.fft.fftshift(np.fft.fft2(img_array))) + 1)
+        return RegressionSuite.reference_normalize(magnitude)
+
+    @staticmethod
+    def reference_multi_otsu(img_array): #busca exaustiva dos dois limiares (3 classes); limiar t = último nível da classe de baixo
+        hist = np.histogram(img_array.ravel(), bins=256, range=(0, 256))[0].astype(np.float64)
+        if np.count_nonzero(hist) < 3:
+            raise ValueError("A imagem tem menos níveis de cinza do que classes pedidas")
+        P = np.concatenate(([0.0], np.cumsum(hist)))
+        S = np.concatenate(([0.0], np.cumsum(hist * np.arange(256))))
+        
+        #fronteiras i < j: classes [0, i), [i, j) e [j, 256), avaliadas todas de uma vez
+        i, j = np.ogrid[:257, :257]
+        total = np.zeros((257, 257))
+        for weight, moment in [(P[i], S[i]), (P[j] - P[i], S[j] - S[i]), (P[256] - P[j], S[256] - S[j])]:
+            weight, moment = np.broadcast_arrays(weight, moment)
+            total += np.divide(moment**2, weight, out=np.zeros((257, 257)), where=weight > 0)
+        total[(j <= i) | (i < 1) | (j > 255)] = -np.inf
+        
+        t1, t2 = np.unravel_index(np.argmax(total), total.shape)
+        return [int(t1) - 1, int(t2) - 1]
+
+    @staticmethod
+    def reference_intensity_stats(img_array):
+        img = img_array.astype(np.float64)
+        return {
+            'mean': np.mean(img),
+            'std': np.std(img),
+            'median': np.median(img),
+            'min': np.min(img),
+            'max': np.max(img),
+            'energy': np.sum(img**2),
+            'entropy': measure.shannon_entropy(img_array)
+        }
+
+    @staticmethod
+    def reference_haralick(img_array):
+        glcm = skimage.feature.graycomatrix(img_array, distances=[1], angles=[0], levels=256, symmetric=True, normed=True)
+        props = {'contrast': 'contrast', 'dissimilarity': 'dissimilarity', 'homogeneity': 'homogeneity',
+                 'energy': 'energy', 'correlation': 'correlation', 'asm': 'ASM'}
+        return {key: skimage.feature.graycoprops(glcm, prop)[0, 0] for key, prop in props.items()}
+
+    @staticmethod
+    def reference_shape_moments(img_array):
+        _, binary = cv2.threshold(img_array, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        moments = cv2.moments(binary)
+        return {
+            'spatial_moments': {key: moments[key] for key in ('m00', 'm10', 'm01', 'm20', 'm11', 'm02')},
+            'central_moments': {key: moments[key] for key in ('mu20', 'mu11', 'mu02', 'mu30', 'mu21', 'mu12', 'mu03')},
+            'hu_moments': list(cv2.HuMoments(moments)[:, 0])
+        }
+
+    @staticmethod
+    def reference_adaptive(img_array, method):
+        img = img_array.astype(np.float64)
+        if method == 'sauvola':
+            threshold = threshold_sauvola(img, window_size=15, k=0.2, r=127.5)
+        elif method == 'niblack':
+            threshold = threshold_niblack(img, window_size=15, k=0.2)
+        else:
+            threshold = uniform_filter(img, size=15, mode='mirror') * (1 - 0.15)
+        return ((img > threshold) * 255).astype(np.uint8)
+
+    @staticmethod
+    def reference_filter_bank(img_array, filters):
+        img = img_array.astype(np.float64)
+        responses = {
+            'mean': lambda: uniform_filter(img, size=3),
+            'gaussian': lambda: gaussian_filter(img, sigma=1),
+            'max': lambda: maximum_filter(img, size=3),
+            'min': lambda: minimum_filter(img, size=3),
+            'median': lambda: median_filter(img, size=3),
+            'laplacian': lambda: laplace(img)
+        }
+        bank = []
+        for name in filters:
+            if name in responses:
+                bank.append(responses[name]())
+            else:
+                bank.append(RegressionSuite.reference_gradient(img, name))
+        return np.stack(bank, axis=-1)
+
+    #----- casos -----
+
+    @staticmethod
+    def cases(): #(nome, caminho otimizado, referência, tolerância, orçamento de tempo relativo ou None)
+        cases = []
+        for filter_type in FILTER_TYPES:
+            cases.append((f"apply_filter[{filter_type}]",
+                          lambda img, f=filter_type: ImageOperations.apply_filter(img, f),
+                          lambda img, f=filter_type: RegressionSuite.reference_filter(img, f),
+                          MEAN_ROUNDING if filter_type == 'mean' else PIXEL_ROUNDING))
+        for filter_type in FREQUENCY_TYPES:
+            cases.append((f"frequency_filter[{filter_type}]",
+                          lambda img, f=filter_type: ImageOperations.frequency_filter(img, f),
+                          lambda img, f=filter_type: RegressionSuite.reference_frequency_filter(img, f),
+                          PIXEL_ROUNDING))
+        for operation in MORPHOLOGY_OPS:
+            cases.append((f"apply_morphology[{operation}]",
+                          lambda img, op=operation: ImageOperations.apply_morphology(img, op),
+                          lambda img, op=operation: RegressionSuite.reference_morphology(img, op),
+                          PIXEL_EXACT))
+        cases += [
+            ("apply_otsu", lambda img: ImageOperations.apply_otsu(img)[0],
+             lambda img: ((img > threshold_otsu(img)) * 255).astype(np.uint8), PIXEL_EXACT),
+            ("contrast_stretching", ImageOperations.contrast_stretching,
+             lambda img: exposure.rescale_intensity(img, in_range=tuple(np.percentile(img, (2, 98))), out_range='uint8'),
+             PIXEL_EXACT),
+            ("histogram_equalization", ImageOperations.histogram_equalization,
+             lambda img: (255 * exposure.equalize_hist(img)).astype(np.uint8), PIXEL_EXACT),
+            ("calculate_fourier_spectrum", ImageOperations.calculate_fourier_spectrum,
+             RegressionSuite.reference_spectrum, PIXEL_EXACT),
+            ("fourier_spectrum_from_rfft",
+             lambda img: ImageOperations.fourier_spectrum_from_rfft(scipy.fft.rfft2(img.astype(np.float32)), img.shape[1]),
+             RegressionSuite.reference_spectrum, PIXEL_ROUNDING),
+            ("calculate_histogram", ImageOperations.calculate_histogram,
+             lambda img: np.histogram(img.ravel(), bins=256, range=(0, 256))[0], VALUES),
+            ("apply_multi_otsu", lambda img: Segmentation.apply_multi_otsu(img, 3)[1],
+             RegressionSuite.reference_multi_otsu, VALUES),
+            ("calculate_intensity_stats", Descriptors.calculate_intensity_stats,
+             RegressionSuite.reference_intensity_stats, VALUES),
+            ("calculate_intensity_stats_from_histogram",
+             lambda img: Descriptors.calculate_intensity_stats_from_histogram(ImageOperations.calculate_histogram(img), img.dtype),
+             RegressionSuite.reference_intensity_stats, {'rtol': 1e-9, 'atol': 1e-9}),
+            ("calculate_haralick_features", Descriptors.calculate_haralick_features,
+             RegressionSuite.reference_haralick, VALUES),
+            ("calculate_shape_moments", Descriptors.calculate_shape_moments,
+             RegressionSuite.reference_shape_moments, VALUES),
+            ("filter_bank", lambda img: FilterBank.apply(img, FILTER_TYPES),
+             lambda img: RegressionSuite.reference_filter_bank(img, FILTER_TYPES), {'rtol': 1e-5, 'atol': 1e-3}),
+            ("filter_bank[median 5]", lambda img: FilterBank.apply(img, [('median', 5)]), #histograma deslizante no backend numba
+             lambda img: median_filter(img, size=(5, 5) + (1,) * (img.ndim - 2))[..., np.newaxis], VALUES)
+        ]
+        for method in ['sauvola', 'niblack', 'bradley']:
+            functions = {'sauvola': Segmentation.apply_sauvola, 'niblack': Segmentation.apply_niblack,
+                         'bradley': Segmentation.apply_bradley}
+            cases.append((f"adaptive_threshold[{method}]", functions[method],
+                          lambda img, m=method: RegressionSuite.reference_adaptive(img, m), THRESHOLD_EDGE))
+        return [case + (TIME_BUDGETS.get(case[0]),) for case in cases]
+
+    @staticmethod
+    def batch_cases(): #operações com batch=True conferidas contra o laço imagem a imagem
+        cases = [(f"apply_filter[{f}]", lambda img, batch, f=f: ImageOperations.apply_filter(img, f, batch=batch))
+                 for f in FILTER_TYPES]
+        cases += [(f"frequency_filter[{f}]", lambda img, batch, f=f: ImageOperations.frequency_filter(img, f, batch=batch))
+                  for f in FREQUENCY_TYPES]
+        cases += [(f"apply_morphology[{op}]", lambda img, batch, op=op: ImageOperations.apply_morphology(img, op, batch=batch))
+                  for op in MORPHOLOGY_OPS]
+        cases += [
+            ("apply_otsu", lambda img, batch: ImageOperations.apply_otsu(img, batch=batch)[0]),
+            ("contrast_stretching", lambda img, batch: ImageOperations.contrast_stretching(img, batch=batch)),
+            ("histogram_equalization", lambda img, batch: ImageOperations.histogram_equalization(img, batch=batch)),
+            ("calculate_histogram", lambda img, batch: ImageOperations.calculate_histogram(img, batch=batch)),
+            ("calculate_fourier_spectrum", lambda img, batch: ImageOperations.calculate_fourier_spectrum(img, batch=batch)),
+            ("calculate_intensity_stats", lambda img, batch: Descriptors.calculate_intensity_stats(img, batch=batch)),
+            ("calculate_haralick_features", lambda img, batch: Descriptors.calculate_haralick_features(img, batch=batch)),
+            ("calculate_shape_moments", lambda img, batch: Descriptors.calculate_shape_moments(img, batch=batch))
+        ]
+        return cases
+
+    #----- comparação -----
+
+    @staticmethod
+    def compare(result, expected, tolerance): #devolve (passou, descrição da maior diferença)
+        if 'levels' in tolerance:
+            result, expected = np.asarray(result), np.asarray(expected)
+            if result.shape != expected.shape:
+                return False, f"shape {result.shape} != {expected.shape}"
+            diff = np.abs(result.astype(np.int64) - expected.astype(np.int64))
+            fraction = np.count_nonzero(diff) / diff.size
+            passed = diff.max() <= tolerance['levels'] and fraction <= tolerance['fraction']
+            return passed, f"máx {diff.max()} níveis, {fraction:.3%} dos pixels"
+
+        result, expected = RegressionSuite.flatten(result), RegressionSuite.flatten(expected)
+        if result.keys() != expected.keys():
+            return False, "chaves diferentes"
+        worst = 0.0
+        passed = True
+        for key in result:
+            a, b = np.asarray(result[key], np.float64), np.asarray(expected[key], np.float64)
+            if a.shape != b.shape:
+                return False, f"{key}: shape {a.shape} != {b.shape}"
+            error = np.abs(a - b)
+            passed &= bool(np.all(error <= tolerance['atol'] + tolerance['rtol'] * np.abs(b)))
+            worst = max(worst, float(np.max(error / np.maximum(np.abs(b), tolerance['atol'] / tolerance['rtol']), initial=0)))
+        return passed, f"erro relativo máx {worst:.1e}"
+
+    @staticmethod
+    def flatten(value, prefix=''): #dict aninhado / lista / array -> {chave: array}
+        if isinstance(value, dict):
+            flat = {}
+            for key, item in value.items():
+                flat.update(RegressionSuite.flatten(item, f"{prefix}{key}."))
+            return flat
+        return {prefix.rstrip('.') or 'value': np.asarray(value)}
+
+    @staticmethod
+    def select(value, index): #resultado da imagem index dentro de um resultado em lote (dict aninhado)
+        if isinstance(value, dict):
+            return {key: RegressionSuite.select(item, index) for key, item in value.items()}
+        return value[index]
+
+    @staticmethod
+    def fingerprint(result): #resumo guardado no arquivo de referência: hash exato + valores para comparar com tolerância
+        if isinstance(result, dict) or np.ndim(result) <= 1:
+            values = {key: np.asarray(value, np.float64).tolist() for key, value in RegressionSuite.flatten(result).items()}
+            return {'values': values}
+        img_array = np.ascontiguousarray(np.asarray(result))
+        rows, cols = img_array.shape[:2]
+        #média de blocos 8x8 da imagem: detecta mudanças de resultado mesmo quando o hash muda por arredondamento
+        blocks = img_array[:rows - rows % 8, :cols - cols % 8].astype(np.float64)
+        blocks = blocks.reshape(8, rows // 8, 8, cols // 8, *img_array.shape[2:]).mean(axis=(1, 3))
+        return {
+            'digest': hashlib.sha256(img_array.tobytes()).hexdigest(),
+            'shape': list(img_array.shape),
+            'dtype': img_array.dtype.str,
+            'blocks': np.round(blocks, 4).tolist()
+        }
+
+    @staticmethod
+    def compare_golden(result, golden, tolerance):
+        current = RegressionSuite.fingerprint(result)
+        if 'values' in golden:
+            return RegressionSuite.compare(current['values'], golden['values'], VALUES if 'levels' in tolerance else tolerance)
+        if current['shape'] != golden['shape'] or current['dtype'] != golden['dtype']:
+            return False, "shape/dtype diferente da referência gravada"
+        if current['digest'] == golden['digest']:
+            return True, "idêntico"
+        #resultado mudou: aceita só se a média dos blocos continuar dentro da tolerância de níveis
+        drift = np.max(np.abs(np.array(current['blocks']) - np.array(golden['blocks'])))
+        limit = tolerance.get('levels', 0) * tolerance.get('fraction', 0) + 1e-3
+        return drift <= limit, f"hash diferente, deriva dos blocos {drift:.4f}"
+
+    #----- execução -----
+
+    @staticmethod
+    def outcome(function, img_array): #(resultado, None) ou (None, erro) quando a operação recusa a entrada
+        try:
+            result = function(img_array)
+        except ValueError as error:
+            return None, str(error)
+        if not isinstance(result, (dict, list)):
+            result = np.asarray(result)
+        return result, None
+
+    @staticmethod
+    def time_ratio(fast, reference, image, repeat=7, sample_time=0.05): #tempo do caminho otimizado / referência
+        #cada amostra repete a chamada até ~sample_time (o histograma leva ~1 ms: uma chamada isolada é só ruído) e as
+        #amostras dos dois caminhos se alternam, para variações de carga da máquina atingirem os dois igualmente
+        timers = [timeit.Timer(lambda function=function: function(image)) for function in (fast, reference)]
+        numbers = [max(1, int(sample_time / max(timer.timeit(1), 1e-6))) for timer in timers]
+        best = [np.inf, np.inf]
+        for _ in range(repeat):
+            for k, (timer, number) in enumerate(zip(timers, numbers)):
+                best[k] = min(best[k], timer.timeit(number) / number)
+        return best[0] / best[1]
+
+    @staticmethod
+    def check_pool(images): #em regime (quadro já visto), os *_array não podem alocar nenhum buffer novo no pool
+        failures = []
+        pool = ImageOperations.buffer_pool()
+        operations = [(f"apply_filter_array[{f}]", lambda img, f=f: ImageOperations.apply_filter_array(img, f))
+                      for f in FILTER_TYPES]
+        operations += [(f"frequency_filter_array[{f}]", lambda img, f=f: ImageOperations.frequency_filter_array(img, f))
+                       for f in FREQUENCY_TYPES]
+        for image_name, img_array in images.items():
+            for name, operation in operations:
+                operation(img_array) #aquecimento: cria os buffers deste tamanho
+                pool.reset_counter()
+                operation(img_array)
+                if pool.allocations:
+                    failures.append(f"{name} ({image_name}): {pool.allocations} alocação(ões) no pool após o aquecimento")
+        return failures
+
+    @staticmethod
+    def run(update_golden=False, timing=True, timing_image='camera', backend='numpy'):
+        #backend 'numba': os mesmos casos (e as mesmas saídas gravadas) passando pelos kernels de NumbaKernels
+        print(f"backend: {ImageOperations.set_backend(backend)}")
+        if ImageOperations.backend == 'numba':
+            ImageOperations.kernels().warm_up(background=False)
+        images = RegressionSuite.make_images()
+        golden = {} if update_golden or not os.path.exists(GOLDEN_PATH) else json.load(open(GOLDEN_PATH, encoding='utf-8'))
+        new_golden = {}
+        failures = []
+
+        print("== caminho otimizado x referência (e x saída gravada) ==")
+        for name, fast, reference, tolerance, budget in RegressionSuite.cases():
+            notes = []
+            for image_name, img_array in images.items():
+                result, error = RegressionSuite.outcome(fast, img_array)
+                expected, expected_error = RegressionSuite.outcome(reference, img_array)
+                if error or expected_error:
+                    #entrada inválida para a operação (ex.: menos níveis que classes): os dois caminhos precisam recusar
+                    if not (error and expected_error):
+                        failures.append(f"{name} ({image_name}): só um dos caminhos falhou ({error or expected_error})")
+                    continue
+                passed, detail = RegressionSuite.compare(result, expected, tolerance)
+                if not passed:
+                    failures.append(f"{name} ({image_name}): {detail}")
+                notes.append(detail)
+
+                key = f"{name}/{image_name}"
+                new_golden[key] = RegressionSuite.fingerprint(result)
+                if key in golden:
+                    passed, detail = RegressionSuite.compare_golden(result, golden[key], tolerance)
+                    if not passed:
+                        failures.append(f"{name} ({image_name}) x referência gravada: {detail}")
+
+            line = f"{name:<42} {notes[-1]}"
+            if timing and budget is not None:
+                img_array = images[timing_image]
+                ratio = RegressionSuite.time_ratio(fast, reference, img_array)
+                line += f" | tempo {ratio:.2f}x da referência (limite {budget:.2f}x)"
+                if ratio > budget:
+                    failures.append(f"{name}: {ratio:.2f}x do tempo da referência, acima do limite {budget:.2f}x")
+            print(line)
+
+        print("== batch=True x laço imagem a imagem ==")
+        for stack_name, stack in RegressionSuite.make_stacks(images).items():
+            for name, operation in RegressionSuite.batch_cases():
+                if 'haralick' in name and stack.dtype == np.uint16:
+                    continue #GLCM de 256x256 por imagem: o uint16 é quantizado igual ao uint8
+                batched = operation(stack, True)
+                looped = [operation(img, False) for img in stack]
+                if isinstance(batched, dict):
+                    #imagem a imagem, campo a campo
+                    passed, detail = True, ""
+                    for index, item in enumerate(looped):
+                        ok, detail = RegressionSuite.compare(RegressionSuite.select(batched, index), item,
+                                                             {'rtol': 1e-8, 'atol': 1e-6})
+                        passed &= ok
+                else:
+                    passed, detail = RegressionSuite.compare(batched, np.stack([np.asarray(img) for img in looped]), PIXEL_EXACT)
+                if not passed:
+                    failures.append(f"batch {name} ({stack_name}): {detail}")
+            print(f"{stack_name:<10} {len(RegressionSuite.batch_cases())} operações conferidas")
+
+        print("== pool de buffers em regime ==")
+        pool_failures = RegressionSuite.check_pool(images)
+        failures += pool_failures
+        print(f"{'filtros e filtros de frequência':<42} {'com' if pool_failures else 'sem'} alocações após o aquecimento")
+
+        if update_golden:
+            with open(GOLDEN_PATH, 'w', encoding='utf-8') as file:
+                json.dump(new_golden, file, indent=1)
+            print(f"referências gravadas em {GOLDEN_PATH}")
+
+        print(f"== {len(failures)} falha(s) ==")
+        for failure in failures:
+            print("  " + failure)
+        return failures
+
+
+if __name__ == '__main__':
+    backend = sys.argv[sys.argv.index('--backend') + 1] if '--backend' in sys.argv else 'numpy'
+    failures = RegressionSuite.run(update_golden='--update-golden' in sys.argv, timing='--skip-timing' not in sys.argv,
+                                   backend=backend)
+    sys.exit(1 if failures else 0)
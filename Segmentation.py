@@ -0,0 +1,142 @@
+import numpy as np
+from skimage.util import dtype_limits
+from ImageOperations import ImageOperations
+
+
+class Segmentation:
+    @staticmethod
+    def apply_sauvola(image, window_size=15, k=0.2, r=None): #limiarização adaptativa de Sauvola: T = m * (1 + k * (s / R - 1))
+        img_array = np.asarray(image)
+        mean, std = Segmentation.local_mean_std(img_array, window_size)
+        if r is None:
+            imin, imax = dtype_limits(img_array, clip_negative=False)
+            r = 0.5 * (imax - imin)
+
+        threshold = mean * (1 + k * (std / r - 1))
+        return Segmentation._to_binary_image(img_array > threshold, image)
+
+    @staticmethod
+    def apply_niblack(image, window_size=15, k=0.2): #limiarização adaptativa de Niblack: T = m - k * s
+        img_array = np.asarray(image)
+        mean, std = Segmentation.local_mean_std(img_array, window_size)
+
+        threshold = mean - k * std
+        return Segmentation._to_binary_image(img_array > threshold, image)
+
+    @staticmethod
+    def apply_bradley(image, window_size=15, t=0.15): #limiarização de Bradley-Roth: pixel acima de (1 - t) vezes a média local
+        img_array = np.asarray(image)
+        mean = Segmentation.local_mean(img_array, window_size)
+
+        threshold = mean * (1 - t)
+        return Segmentation._to_binary_image(img_array > threshold, image)
+
+    @staticmethod
+    def apply_multi_otsu(image, classes=3): #Otsu multinível: separa a imagem em `classes` regiões
+        img_array = np.asarray(image)
+        #sempre 256 bins (16 bits e float são agrupados), então a busca não depende da profundidade
+        hist = ImageOperations.calculate_histogram(img_array)
+        bins = Segmentation.multi_otsu_thresholds(hist, classes)
+
+        #limiar = último valor do bin que fecha a classe de baixo (em uint8, o próprio bin)
+        low, high = ImageOperations._value_range(img_array.dtype)
+        width = (high - low) / hist.size
+        if img_array.dtype.kind in 'ui':
+            thresholds = [int(low + (b + 1) * width) - 1 for b in bins]
+        else:
+            thresholds = [low + (b + 1) * width for b in bins]
+
+        #pixels iguais ao limiar ficam na classe de baixo (como em apply_otsu: img > threshold)
+        labels = np.digitize(img_array, thresholds, right=True)
+        out_dtype = ImageOperations._output_dtype(img_array, None)
+        levels = ImageOperations._from_unit(np.arange(classes) / (classes - 1), out_dtype)
+        return ImageOperations._wrap(levels[labels], image), thresholds
+
+    @staticmethod
+    def multi_otsu_thresholds(hist, classes=3): #busca os limiares só no histograma, com momentos acumulados pré-calculados
+        if classes < 2:
+            raise ValueError("Otsu multinível precisa de pelo menos 2 classes")
+        hist = np.asarray(hist, dtype=np.float64)
+        nbins = hist.size
+        if np.count_nonzero(hist) < classes:
+            raise ValueError("A imagem tem menos níveis de cinza do que classes pedidas")
+
+        #momentos acumulados de ordem 0 e 1 (com zero na frente): classe (i, j] tem peso P[j]-P[i] e soma S[j]-S[i]
+        P = np.concatenate(([0.0], np.cumsum(hist)))
+        S = np.concatenate(([0.0], np.cumsum(hist * np.arange(nbins))))
+
+        choices = ImageOperations.kernels().multi_otsu_choices(P, S, classes) if ImageOperations.use_kernels() else None
+        if choices is None:
+            choices = Segmentation._multi_otsu_choices(P, S, classes)
+
+        #reconstrói as fronteiras a partir da última classe (que termina em nbins)
+        bounds = []
+        end = nbins
+        for choice in reversed(choices):
+            end = choice[end]
+            bounds.append(end)
+
+        #fronteira b significa que a classe de baixo termina no nível b - 1
+        return [int(b) - 1 for b in reversed(bounds)]
+
+    @staticmethod
+    def _multi_otsu_choices(P, S, classes): #para cada classe e fronteira final j, a melhor fronteira anterior
+        nbins = P.size - 1
+        #custo[i, j] = S_ij^2 / P_ij; maximizar a soma dos custos equivale a maximizar a variância entre classes
+        weight = P[None, :] - P[:, None]
+        moment = S[None, :] - S[:, None]
+        cost = np.divide(moment**2, weight, out=np.zeros_like(weight), where=weight > 0)
+        cost[np.tri(nbins + 1, dtype=bool)] = -np.inf #só intervalos com i < j
+
+        #programação dinâmica sobre as fronteiras: O(classes * nbins^2), independente do número de pixels
+        best = cost[0]
+        choices = []
+        for _ in range(classes - 1):
+            total = best[:, None] + cost
+            choice = np.argmax(total, axis=0)
+            choices.append(choice)
+            best = np.take_along_axis(total, choice[np.newaxis, :], axis=0)[0]
+        return choices
+
+    @staticmethod
+    def integral_image(img_array): #tabela de áreas somadas com uma linha/coluna de zeros na frente (canais em lote)
+        rows, cols = img_array.shape[:2]
+        sat = np.zeros((rows + 1, cols + 1) + img_array.shape[2:], np.float64)
+        np.cumsum(img_array, axis=0, dtype=np.float64, out=sat[1:, 1:])
+        np.cumsum(sat[1:, 1:], axis=1, out=sat[1:, 1:])
+        return sat
+
+    @staticmethod
+    def window_sums(sat, window_size): #soma de cada janela window_size x window_size em O(1) por pixel
+        w = window_size
+        return sat[w:, w:] - sat[:-w, w:] - sat[w:, :-w] + sat[:-w, :-w]
+
+    @staticmethod
+    def local_mean(img_array, window_size):
+        padded = Segmentation._pad(img_array, window_size)
+        return Segmentation.window_sums(Segmentation.integral_image(padded), window_size) / window_size**2
+
+    @staticmethod
+    def local_mean_std(img_array, window_size): #média e desvio padrão locais a partir das tabelas da imagem e do seu quadrado
+        padded = Segmentation._pad(img_array, window_size)
+        n = window_size**2
+
+        mean = Segmentation.window_sums(Segmentation.integral_image(padded), window_size) / n
+        sq_mean = Segmentation.window_sums(Segmentation.integral_image(padded**2), window_size) / n
+
+        variance = sq_mean - mean**2
+        np.maximum(variance, 0, out=variance) #erros de arredondamento podem deixar a variância levemente negativa
+        return mean, np.sqrt(variance)
+
+    @staticmethod
+    def _pad(img_array, window_size): #borda refletida para que toda janela tenha window_size^2 pixels
+        if window_size < 1 or window_size % 2 == 0:
+            raise ValueError("O tamanho da janela deve ser um número ímpar positivo")
+        half = window_size // 2
+        pad_width = [(half, half)] * 2 + [(0, 0)] * (img_array.ndim - 2) #eixos de canal não são preenchidos
+        return np.pad(img_array.astype(np.float64), pad_width, mode='reflect')
+
+    @staticmethod
+    def _to_binary_image(binary_img, image): #0/máximo do dtype da entrada, no mesmo tipo (PIL ou ndarray)
+        out_dtype = ImageOperations._output_dtype(np.asarray(image), None)
+        return ImageOperations._wrap(ImageOperations._from_unit(binary_img, out_dtype), image)